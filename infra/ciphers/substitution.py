@@ -1,78 +1,690 @@
 """Functions for substitution ciphers."""
 
 import math
+import multiprocessing
+import os
 import random
-from typing import Dict, Tuple
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from functools import lru_cache
+from itertools import compress, repeat
+from multiprocessing.synchronize import Event
+from operator import add, ge, mul
+from string import ascii_uppercase
+from types import ModuleType
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+    overload,
+)
 
-from infra.stats import calc_stats, transform_stats_with_substitution_key
+from infra import nla
+from infra.scoring import NGramScorer, ngram_scorer_en
+from infra.stats import Stats, calc_stats, letter_codes, ngram_codes
+from infra.text import TextBuffer
+
+
+class SubstitutionScorer:
+    """
+    Keeps track of the n-gram error of a text while its substitution key is mutated by swaps.
+
+    The error is the same as the `total_error` of `transform_stats_with_substitution_key`. A proposed mutation only
+    rescores the n-grams containing one of the swapped letters, and is then either committed or rejected. The key is
+    expected to be a bijection.
+
+    >>> from infra.stats import transform_stats_with_substitution_key
+    >>> stats = calc_stats("URYYBJBEYQ")
+    >>> key = {c: c for c in "BEJQRUY"}
+    >>> scorer = SubstitutionScorer(stats, key)
+    >>> delta = scorer.propose([("U", "Q")])
+    >>> key["U"], key["Q"] = "Q", "U"
+    >>> expected = transform_stats_with_substitution_key(stats, key).total_error
+    >>> round(scorer.total_error + delta, 12) == round(expected, 12)
+    True
+    >>> scorer.commit()
+    >>> scorer.key == key
+    True
+    """
+
+    def __init__(self, stats: Stats, key: Dict[str, str]):
+        """
+        Create a scorer.
+
+        :param stats: The stats of the text to substitute.
+        :param key: The initial substitution key.
+        """
+        self._key = key.copy()
+        self._ngrams: List[Tuple[str, float, Dict[str, float], float]] = [
+            (ngram, frq, reference, weight)
+            for frequencies, reference, weight in (
+                (stats.monogram, nla.letter_frq_en, 1.0),
+                (stats.bigrams, nla.bigram_frq_en, 1.0),
+                (stats.trigrams, nla.trigram_frq_en, 2.0),
+            )
+            for ngram, frq in frequencies.items()
+        ]
+        self._ngrams_by_char: Dict[str, List[int]] = {}
+        for i, (ngram, _, _, _) in enumerate(self._ngrams):
+            for char in set(ngram):
+                self._ngrams_by_char.setdefault(char, []).append(i)
+
+        self._errors = [self._ngram_error(i, self._key) for i in range(len(self._ngrams))]
+        self._total_error = sum(self._errors)
+        self._pending: Optional[Tuple[Dict[str, str], Dict[int, float], float]] = None
+
+    def _ngram_error(self, i: int, key: Dict[str, str]) -> float:
+        ngram, frq, reference, weight = self._ngrams[i]
+        return weight * (reference.get("".join(key.get(c, c) for c in ngram), 0.0) - frq) ** 2
+
+    @property
+    def key(self) -> Dict[str, str]:
+        """The current substitution key."""
+        return self._key.copy()
+
+    @property
+    def total_error(self) -> float:
+        """The current total n-gram error."""
+        return self._total_error
+
+    def propose(self, swaps: Sequence[Tuple[str, str]]) -> float:
+        """
+        Propose a key mutation, replacing a previously proposed one.
+
+        :param swaps: Pairs of key entries to swap the values of, applied in order.
+        :return: The change of the total error if the mutation is committed.
+        """
+        key = self._key.copy()
+        affected = set()
+        for a, b in swaps:
+            key[a], key[b] = key[b], key[a]
+            affected.update(self._ngrams_by_char.get(a, ()))
+            affected.update(self._ngrams_by_char.get(b, ()))
+
+        errors = {i: self._ngram_error(i, key) for i in affected}
+        delta = sum(error - self._errors[i] for i, error in errors.items())
+        self._pending = key, errors, delta
+        return delta
+
+    def commit(self):
+        """Apply the proposed mutation."""
+        assert self._pending is not None
+        self._key, errors, delta = self._pending
+        for i, error in errors.items():
+            self._errors[i] = error
+        self._total_error += delta
+        self._pending = None
+
+    def reject(self):
+        """Discard the proposed mutation."""
+        self._pending = None
+
+
+class _TextErrorScorer:
+    """Same interface as `SubstitutionScorer`, but rescoring the whole substituted text with an error function."""
+
+    def __init__(self, text: str, key: Dict[str, str], error_fn: Callable[[str], float]):
+        self._text = text
+        self._error_fn = error_fn
+        self.key = key.copy()
+        self.total_error = error_fn(substitute(text, key))
+        self._pending: Optional[Tuple[Dict[str, str], float]] = None
+
+    def propose(self, swaps: Sequence[Tuple[str, str]]) -> float:
+        key = self.key.copy()
+        for a, b in swaps:
+            key[a], key[b] = key[b], key[a]
+        error = self._error_fn(substitute(self._text, key))
+        self._pending = key, error
+        return error - self.total_error
+
+    def commit(self):
+        assert self._pending is not None
+        self.key, self.total_error = self._pending
+        self._pending = None
+
+    def reject(self):
+        self._pending = None
+
+
+def _hillclimb(
+    scorer: Union[SubstitutionScorer, _TextErrorScorer],
+    key_chars: Sequence[str],
+    max_tries: float,
+    max_search_depth: int,
+    rng: Union[random.Random, ModuleType],
+    deadline: Optional[float] = None,
+    stop: Optional[Event] = None,
+) -> int:
+    """
+    Mutate the key of a scorer until no improvement is found, returning the number of evaluated mutations.
+
+    The climb also ends at the `deadline`, checked every 1024 mutations, or as soon as the `stop` event is set.
+    """
+    evaluations = 0
+    search_depth = 1
+
+    while True:
+        try_max = math.ceil(max_tries * 26.0 ** (search_depth - 1))
+
+        next_depth_loop = False
+        for _ in range(try_max):
+            if stop is not None and stop.is_set():
+                return evaluations
+            swaps = [(rng.choice(key_chars), rng.choice(key_chars)) for _ in range(search_depth)]
+            evaluations += 1
+            if scorer.propose(swaps) < 0:
+                scorer.commit()
+                search_depth = 1
+                next_depth_loop = True
+                break
+            if deadline is not None and evaluations % 1024 == 0 and time.time() > deadline:
+                return evaluations
+
+        if next_depth_loop:
+            continue
+
+        search_depth += 1
+        if search_depth > max_search_depth:
+            return evaluations
 
 
 def substitution_hillclimb_attack(
-    text: str,
+    text: Union[str, TextBuffer],
     key: Dict[str, str],
     max_tries: float = 1000,
     max_search_depth: int = 3,
+    error_fn: Optional[Callable[[str], float]] = None,
+    rng: Optional[random.Random] = None,
 ) -> Tuple[float, Dict[str, str]]:
     """
     Perform a hillclimb bruteforce substition cipher attack.
 
-    This algorithm is non-deterministic and results may vary when called multiple times with the same input.
+    This algorithm is non-deterministic and results may vary when called multiple times with the same input, unless a
+    seeded random generator is given.
 
-    :param text: The text to decrypt.
+    :param text: The text to decrypt, or its text buffer.
     :param key: The initial key to mutate from.
     :param max_tries: Number of mutations tried before increasing search depth.
     :param max_search_depth: Maximum search depth.
+    :param error_fn: An error function scoring the substituted text, e.g. `infra.scoring.NGramScorer.error`. Defaults
+                     to the n-gram error of the text stats, which is updated incrementally.
+    :param rng: The random generator, defaults to the `random` module.
     :return: The best error score and corresponding mutated key.
+
+    >>> text = TextBuffer.from_text("Hello, World!")
+    >>> substitution_hillclimb_attack(text, {c: c for c in "DEHLORW"}, 10, 1, rng=random.Random(1))[0] > 0
+    True
     """
+    text = str(text)
     text_stats = calc_stats(text)
 
     assert text_stats.letter_count != 0
 
-    # Init best scores and key to current
-    best_key = key.copy()
-    best_error = transform_stats_with_substitution_key(text_stats, best_key).total_error
+    scorer = SubstitutionScorer(text_stats, key) if error_fn is None else _TextErrorScorer(text, key, error_fn)
+    _hillclimb(scorer, tuple(key.keys()), max_tries, max_search_depth, rng or random)
+    return scorer.total_error, scorer.key
 
-    search_depth = 1
 
-    while True:
-        try_max = math.ceil(max_tries * 26.0 ** (search_depth - 1))
+# The event telling the restarts running in a worker process to stop climbing, see `_init_restart_worker`
+_restart_stop: Optional[Event] = None
 
-        next_depth_loop = False
-        for _ in range(try_max):
-            mutated_key = best_key.copy()
-            for _ in range(search_depth):
-                swap_a = random.choice(tuple(mutated_key.keys()))
-                swap_b = random.choice(tuple(mutated_key.keys()))
-                mutated_key[swap_a], mutated_key[swap_b] = mutated_key[swap_b], mutated_key[swap_a]
-
-            key = mutated_key
-            current_error = transform_stats_with_substitution_key(text_stats, key).total_error
-            if current_error < best_error:
-                search_depth = 1
-                best_error = current_error
-                best_key = key.copy()
-                next_depth_loop = True
+
+def _init_restart_worker(stop: Event):
+    """Share the stop event of `substitution_restart_attack` with a worker process."""
+    global _restart_stop
+    _restart_stop = stop
+
+
+def _substitution_restart(
+    text: str,
+    key: Dict[str, str],
+    seed: int,
+    max_tries: float,
+    max_search_depth: int,
+    error_fn: Optional[Callable[[str], float]],
+    deadline: Optional[float],
+) -> Tuple[float, Dict[str, str], int]:
+    """Climb from a random permutation of the key values, returning the error, the key and the evaluation count."""
+    rng = random.Random(seed)
+    values = list(key.values())
+    rng.shuffle(values)
+    start_key = dict(zip(key.keys(), values))
+    if error_fn is None:
+        scorer: Union[SubstitutionScorer, _TextErrorScorer] = SubstitutionScorer(calc_stats(text), start_key)
+    else:
+        scorer = _TextErrorScorer(text, start_key, error_fn)
+    evaluations = _hillclimb(scorer, tuple(key.keys()), max_tries, max_search_depth, rng, deadline, _restart_stop)
+    return scorer.total_error, scorer.key, evaluations
+
+
+@dataclass
+class RestartResults:
+    """The results of `substitution_restart_attack`."""
+
+    results: List[Tuple[float, Dict[str, str], int]]
+    """Tuples of the error, the key and the seed reproducing it, best first, one per distinct key."""
+
+    restarts: int
+    """The number of finished restarts."""
+
+    evaluations: int
+    """The number of evaluated key mutations of all finished restarts."""
+
+    elapsed: float
+    """The wall-clock time in seconds."""
+
+    @property
+    def evaluations_per_second(self) -> float:
+        """The throughput of all restarts together."""
+        return self.evaluations / self.elapsed if self.elapsed > 0 else 0.0
+
+
+def substitution_restart_attack(
+    text: Union[str, TextBuffer],
+    key: Dict[str, str],
+    restarts: int = 16,
+    max_tries: float = 1000,
+    max_search_depth: int = 3,
+    error_fn: Optional[Callable[[str], float]] = None,
+    seed: Optional[int] = None,
+    agreement: Optional[int] = 3,
+    time_budget: Optional[float] = None,
+    processes: Optional[int] = None,
+) -> RestartResults:
+    """
+    Run independent `substitution_hillclimb_attack` restarts from random keys.
+
+    Each restart starts from a random permutation of the key values and uses its own random generator, seeded from
+    `seed`, so every result can be reproduced by its seed. When stopping early, pending restarts are cancelled and
+    running ones are told to stop climbing through a shared event; their results are discarded.
+
+    :param text: The text to decrypt, or its text buffer.
+    :param key: The key whose values are permuted for each restart.
+    :param restarts: The maximum number of restarts.
+    :param max_tries: Number of mutations tried before increasing search depth.
+    :param max_search_depth: Maximum search depth.
+    :param error_fn: An error function scoring the substituted text, see `substitution_hillclimb_attack`.
+    :param seed: The seed of the restart seeds.
+    :param agreement: Stop as soon as this many restarts found the same key, None to run all restarts.
+    :param time_budget: The wall-clock time in seconds after which running restarts stop climbing and no more restarts
+                        are started.
+    :param processes: The number of worker processes, defaults to the number of CPUs; if greater than 1, the error
+                      function must be picklable.
+    :return: The results.
+
+    >>> key = {c: c for c in "DEHLORW"}
+    >>> results = substitution_restart_attack(
+    ...     "HELLOWORLD", key, restarts=8, max_tries=50, max_search_depth=2, seed=1, processes=1)
+    >>> results.restarts, len(results.results)
+    (3, 1)
+    """
+    text = str(text)
+    seeds_rng = random.Random(seed)
+    seeds = [seeds_rng.getrandbits(64) for _ in range(restarts)]
+    processes = processes or os.cpu_count() or 1
+    started = time.time()
+    deadline = None if time_budget is None else started + time_budget
+
+    best: Dict[Tuple[Tuple[str, str], ...], Tuple[float, Dict[str, str], int]] = {}
+    hits: Dict[Tuple[Tuple[str, str], ...], int] = {}
+    finished = 0
+    evaluations = 0
+
+    def collect(restart_seed: int, result: Tuple[float, Dict[str, str], int]) -> bool:
+        """Record a restart result, returning whether to stop."""
+        nonlocal finished, evaluations
+        error, result_key, result_evaluations = result
+        finished += 1
+        evaluations += result_evaluations
+        identity = tuple(sorted(result_key.items()))
+        hits[identity] = hits.get(identity, 0) + 1
+        if identity not in best or error < best[identity][0]:
+            best[identity] = (error, result_key, restart_seed)
+        return (agreement is not None and hits[identity] >= agreement) or (
+            deadline is not None and time.time() > deadline
+        )
+
+    args = (text, key)
+    settings = (max_tries, max_search_depth, error_fn, deadline)
+    if processes == 1:
+        for restart_seed in seeds:
+            if collect(restart_seed, _substitution_restart(*args, restart_seed, *settings)):
                 break
+    else:
+        stop = multiprocessing.Event()
+        with ProcessPoolExecutor(processes, initializer=_init_restart_worker, initargs=(stop,)) as executor:
+            futures = {
+                executor.submit(_substitution_restart, *args, restart_seed, *settings): restart_seed
+                for restart_seed in seeds
+            }
+            for future in as_completed(futures):
+                if collect(futures[future], future.result()):
+                    # Running restarts return at their next mutation, so leaving the pool does not wait for their climbs
+                    stop.set()
+                    for pending in futures:
+                        pending.cancel()
+                    break
 
-        if next_depth_loop:
-            continue
+    return RestartResults(
+        sorted(best.values(), key=lambda result: result[0]),
+        finished,
+        evaluations,
+        time.time() - started,
+    )
 
-        search_depth += 1
-        if search_depth > max_search_depth:
-            break
 
-    return best_error, best_key
+@overload
+def substitute(text: str, key: Dict[str, str]) -> str: ...
+
 
+@overload
+def substitute(text: TextBuffer, key: Dict[str, str]) -> TextBuffer: ...
 
-def substitute(text: str, key: Dict[str, str]) -> str:
+
+def substitute(text: Union[str, TextBuffer], key: Dict[str, str]) -> Union[str, TextBuffer]:
     """
     Apply a substitution cipher on a text.
 
-    :param text: The text to modify.
+    :param text: The text to modify, or its text buffer.
     :param key: The key.
-    :return: The substituted text.
+    :return: The substituted text, of the same type as the given text.
 
     >>> substitute("HELLO", {"H": "X", "L": "Y"})
     'XEYYO'
+    >>> substitute(TextBuffer.from_text("HELLO"), {"H": "X", "L": "Y"})
+    TextBuffer.from_text('XEYYO')
+    """
+    if isinstance(text, TextBuffer):
+        return text.substitute(key)
+    return text.translate(str.maketrans({c: replacement for c, replacement in key.items() if len(c) == 1}))
+
+
+def keyed_alphabet(keyword: str, shift: int = 0) -> str:
+    """
+    Get a keyword-mixed alphabet, i.e. the distinct letters of the keyword followed by the remaining letters.
+
+    :param keyword: The keyword, non-letters are ignored.
+    :param shift: The number of letters to rotate the alphabet to the left by.
+    :return: The cipher alphabet, the letter at index `i` substituting the `i`-th plain letter.
+
+    >>> keyed_alphabet("Zebras")
+    'ZEBRASCDFGHIJKLMNOPQTUVWXY'
+    >>> keyed_alphabet("Zebras", 3)
+    'RASCDFGHIJKLMNOPQTUVWXYZEB'
+    """
+    alphabet = "".join(dict.fromkeys(c for c in keyword.upper() + ascii_uppercase if c in ascii_uppercase))
+    shift %= len(alphabet)
+    return alphabet[shift:] + alphabet[:shift]
+
+
+def keyed_alphabet_index(keywords: Iterable[str]) -> Dict[str, List[str]]:
+    """
+    Group keywords by their keyed alphabet.
+
+    :param keywords: The keywords.
+    :return: The keywords, grouped by their unshifted keyed alphabet.
+
+    >>> keyed_alphabet_index(["ZEBRA", "ZEBRAS", "zebras", "Zebra's"])
+    {'ZEBRACDFGHIJKLMNOPQSTUVWXY': ['ZEBRA'], 'ZEBRASCDFGHIJKLMNOPQTUVWXY': ['ZEBRAS', 'zebras', "Zebra's"]}
+    """
+    result: Dict[str, List[str]] = {}
+    for keyword in keywords:
+        result.setdefault(keyed_alphabet(keyword), []).append(keyword)
+    return result
+
+
+@lru_cache(maxsize=None)
+def _dictionary_alphabet_index_en() -> Dict[str, List[str]]:
+    return keyed_alphabet_index(sorted(nla.dict_std_en))
+
+
+def keyword_substitution_attack(
+    text: Union[str, TextBuffer],
+    keywords: Optional[Iterable[str]] = None,
+    shifts: Iterable[int] = range(26),
+    max_results: int = 10,
+    max_candidates: int = 1000,
+    scorer: Optional[NGramScorer] = None,
+) -> List[Tuple[float, List[Tuple[str, int]], str]]:
+    """
+    Decode a keyword substitution with dictionary words as keywords and rank the decoded texts.
+
+    Keywords and shifts decoding the letters of the text the same are tried once. As a substitution only permutes the
+    letter counts, all decodings are first ranked by the monogram log-likelihood of the decoded text, calculated from
+    the letter counts of the text alone. The best `max_candidates` decodings are then applied with `str.translate`
+    and ranked with `scorer`.
+
+    :param text: The encoded text, or its text buffer.
+    :param keywords: The keywords to try, defaults to `infra.nla.dict_std_en`.
+    :param shifts: The alphabet shifts to try for each keyword, see `keyed_alphabet`.
+    :param max_results: The maximum number of results.
+    :param max_candidates: The number of decodings to score after ranking by letter counts.
+    :param scorer: The scorer ranking the decoded texts, defaults to the English trigram frequencies.
+    :return: Tuples of the fitness, all keywords and shifts decoding to the text, and the uppercase decoded text, best
+             first.
+
+    >>> encoded = substitute("ATTACKATDAWN", dict(zip(ascii_uppercase, keyed_alphabet("ZEBRAS", 2))))
+    >>> encoded
+    'BUUBAJBUSBXM'
+    >>> keyword_substitution_attack(encoded, ["ALBERT", "ZEBRAS", "ZEBRA"])[0][1:]
+    ([('ZEBRAS', 2)], 'ATTACKATDAWN')
+    """
+    scorer = scorer or ngram_scorer_en(3)
+    index = _dictionary_alphabet_index_en() if keywords is None else keyed_alphabet_index(keywords)
+    bases = list(index)
+    shifts = sorted({shift % 26 for shift in shifts})
+
+    upper = str(text).upper()
+    present = "".join(c for c in ascii_uppercase if c in upper)
+    if not present or not bases:
+        return []
+    present_counts = [upper.count(c) for c in present]
+
+    # The log-likelihoods are scaled to non-negative integers, so that one big integer per plain letter can hold its
+    # weight for all 26 shifts in separate bit fields, and a single sum over the letters of the text scores all shifts
+    # of an alphabet at once. Equal decodings get equal integers.
+    log_probabilities = ngram_scorer_en(1).log_probabilities
+    lowest = min(log_probabilities)
+    weights = [round((log_probability - lowest) * 2**16) for log_probability in log_probabilities]
+    field_size = (sum(present_counts) * max(weights)).bit_length() + 1
+    field_mask = (1 << field_size) - 1
+    packed = [sum(weights[(q - shift) % 26] << (shift * field_size) for shift in range(26)) for q in range(26)]
+    packed_weights = [dict(zip(ascii_uppercase, (count * weight for weight in packed))) for count in present_counts]
+    offsets = [shift * field_size for shift in shifts]
+
+    likelihoods: List[int] = []
+    for base in bases:
+        total = sum(map(dict.__getitem__, packed_weights, present.translate(str.maketrans(base, ascii_uppercase))))
+        likelihoods.extend([(total >> offset) & field_mask for offset in offsets])
+
+    # The plain letters of the letters present in the text identify a decoding
+    threshold = sorted(set(likelihoods), reverse=True)[: max(1, max_candidates)][-1]
+    shift_tables = {
+        shift: str.maketrans(ascii_uppercase, ascii_uppercase[-shift:] + ascii_uppercase[:-shift]) for shift in shifts
+    }
+    candidates: Dict[str, List[Tuple[str, int]]] = {}
+    for i in compress(range(len(likelihoods)), map(ge, likelihoods, repeat(threshold))):
+        base, shift = bases[i // len(shifts)], shifts[i % len(shifts)]
+        decoding = present.translate(str.maketrans(base, ascii_uppercase)).translate(shift_tables[shift])
+        candidates.setdefault(decoding, []).append((base, shift))
+
+    decodings = list(candidates)
+    decoded = [upper.translate(str.maketrans(present, decoding)) for decoding in decodings]
+    ranked = sorted(zip(scorer.fitness_batch(decoded), decodings, decoded), key=lambda result: -result[0])
+    return [
+        (
+            fitness,
+            sorted((keyword, shift) for base, shift in candidates[decoding] for keyword in index[base]),
+            decoded_text,
+        )
+        for fitness, decoding, decoded_text in ranked[:max_results]
+    ]
+
+
+_identity_tail = bytes(range(26, 256))
+
+
+class PermutedNGramCounts:
     """
-    return "".join(key.get(c, c) for c in text)
+    Score the n-gram counts of a text under many letter substitutions.
+
+    The distinct n-grams of the text are stored as one byte string of letter codes per n-gram position. A
+    substitution, given as the 26 substituted letter codes, only renames the letters, so it is applied to the
+    positions with `bytes.translate` without touching the text again.
+
+    >>> from infra.scoring import ngram_scorer_en
+    >>> counts = PermutedNGramCounts("URYYBJBEYQ", ngram_scorer_en(3))
+    >>> rot13 = bytes((code + 13) % 26 for code in range(26))
+    >>> counts.fitness(rot13) == ngram_scorer_en(3).fitness("HELLOWORLD")
+    True
+    """
+
+    def __init__(self, text: Union[str, TextBuffer], scorer: NGramScorer):
+        """
+        Count the n-grams of a text.
+
+        :param text: The text, or its text buffer.
+        :param scorer: The scorer providing the n-gram length and the log-probabilities.
+        """
+        self._scorer = scorer
+        counts = Counter(ngram_codes(letter_codes(text), scorer.n))
+        self._positions = [
+            bytes(code // 26 ** (scorer.n - 1 - position) % 26 for code in counts) for position in range(scorer.n)
+        ]
+        self._counts = list(counts.values())
+        self._total = sum(self._counts)
+
+    def fitness(self, key: bytes) -> float:
+        """
+        Calculate the mean log-probability per n-gram of the substituted text.
+
+        :param key: The substituted letter code of each letter code.
+        :return: The fitness, see `infra.scoring.NGramScorer.fitness`.
+        """
+        if not self._total:
+            return self._scorer.floor
+        table = key + _identity_tail
+        positions = [position.translate(table) for position in self._positions]
+        codes: Iterable[int] = positions[0]
+        for position in positions[1:]:
+            codes = map(add, map(mul, codes, repeat(26)), position)
+        return sum(map(mul, self._counts, map(self._scorer.log_probabilities.__getitem__, codes))) / self._total
+
+    def fitness_batch(self, keys: Iterable[bytes]) -> List[float]:
+        """
+        Calculate the fitness of many substitutions.
+
+        :param keys: The substitutions, see `fitness`.
+        :return: The fitness of each substitution.
+        """
+        return list(map(self.fitness, keys))
+
+
+def _order_crossover(a: bytes, b: bytes, rng: random.Random) -> bytes:
+    """Keep a random slice of the first parent, and fill the rest in the order of the second parent."""
+    start, stop = sorted(rng.sample(range(len(a) + 1), 2))
+    kept = a[start:stop]
+    rest = [code for code in b if code not in kept]
+    return bytes(rest[:start]) + kept + bytes(rest[start:])
+
+
+def _swap_mutation(key: bytes, rng: random.Random) -> bytes:
+    return _swap(key, *rng.sample(range(len(key)), 2))
+
+
+def _polish_key(counts: PermutedNGramCounts, key: bytes, fitness: float) -> Tuple[float, bytes]:
+    """Apply the best single letter swap until none improves the fitness."""
+    while True:
+        swapped = [_swap(key, i, j) for i in range(len(key)) for j in range(i + 1, len(key))]
+        scores = counts.fitness_batch(swapped)
+        best = max(range(len(swapped)), key=scores.__getitem__)
+        if scores[best] <= fitness:
+            return fitness, key
+        fitness, key = scores[best], swapped[best]
+
+
+def _swap(key: bytes, i: int, j: int) -> bytes:
+    result = bytearray(key)
+    result[i], result[j] = result[j], result[i]
+    return bytes(result)
+
+
+def substitution_population_attack(
+    text: Union[str, TextBuffer],
+    population_size: int = 100,
+    generations: int = 200,
+    elite: int = 5,
+    tournament_size: int = 3,
+    mutation_rate: float = 0.5,
+    scorer: Optional[NGramScorer] = None,
+    seed: Optional[int] = None,
+) -> Tuple[float, Dict[str, str]]:
+    """
+    Perform a genetic substitution cipher attack.
+
+    The population consists of letter permutations. Each generation keeps the best `elite` keys and breeds the rest by
+    tournament selection, order crossover and swap mutation; the whole population is scored with
+    `PermutedNGramCounts.fitness_batch`. The first population contains the key matching the letter frequencies of the
+    text to the English ones. The best key is finally improved by single letter swaps.
+
+    This algorithm is non-deterministic unless a seed is given. On short texts, the fittest decoding is often not the
+    plaintext; texts of a few hundred letters are usually needed.
+
+    :param text: The text to decrypt, or its text buffer.
+    :param population_size: The number of keys per generation.
+    :param generations: The number of generations.
+    :param elite: The number of best keys kept unchanged in the next generation.
+    :param tournament_size: The number of keys competing for each parent.
+    :param mutation_rate: The probability of mutating a child.
+    :param scorer: The scorer, defaults to the English trigram frequencies.
+    :param seed: The random seed.
+    :return: The error, i.e. the negated fitness, and the key over the uppercase letters, see `substitute`.
+
+    >>> from infra.scoring import ngram_scorer_en
+    >>> fitness = ngram_scorer_en(3).fitness
+    >>> error, key = substitution_population_attack("URYYBJBEYQ", population_size=10, generations=5, seed=1)
+    >>> round(error, 9) == round(-fitness(substitute("URYYBJBEYQ", key)), 9), -error > fitness("URYYBJBEYQ")
+    (True, True)
+    """
+    scorer = scorer or ngram_scorer_en(3)
+    counts = PermutedNGramCounts(text, scorer)
+    rng = random.Random(seed)
+
+    letter_counts = Counter(letter_codes(text))
+    by_count = sorted(range(26), key=lambda code: -letter_counts[code])
+    english = sorted(range(26), key=lambda code: -ngram_scorer_en(1).log_probabilities[code])
+    frequency_key = bytearray(26)
+    for cipher_code, plain_code in zip(by_count, english):
+        frequency_key[cipher_code] = plain_code
+
+    population = [bytes(frequency_key)]
+    while len(population) < population_size:
+        population.append(bytes(rng.sample(range(26), 26)))
+    scores = counts.fitness_batch(population)
+
+    def select() -> bytes:
+        contestants = rng.sample(range(len(population)), min(tournament_size, len(population)))
+        return population[max(contestants, key=scores.__getitem__)]
+
+    for _ in range(generations):
+        ranked = sorted(range(len(population)), key=scores.__getitem__, reverse=True)[:elite]
+        children = []
+        while len(children) < population_size - len(ranked):
+            child = _order_crossover(select(), select(), rng)
+            if rng.random() < mutation_rate:
+                child = _swap_mutation(child, rng)
+            children.append(child)
+        population = [population[i] for i in ranked] + children
+        scores = [scores[i] for i in ranked] + counts.fitness_batch(children)
+
+    best = max(range(len(population)), key=scores.__getitem__)
+    fitness, key = _polish_key(counts, population[best], scores[best])
+    return -fitness, {chr(ord("A") + code): chr(ord("A") + plain) for code, plain in enumerate(key)}
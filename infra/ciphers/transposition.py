@@ -1,11 +1,36 @@
 """Transposition cipher function."""
+import math
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
 from enum import Enum, auto, unique
-from typing import Callable, Iterable, List, Sequence, Tuple, TypeVar, Union
-
-from infra.nla import dict_std_en
-from infra.stats import Stats, calc_stats
+from functools import lru_cache
+from heapq import heappush, heapreplace, nlargest
+from itertools import accumulate, chain, islice, permutations, product, repeat
+from operator import add, itemgetter, sub
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    TypeVar,
+    Union,
+)
+
+from infra import nla
+from infra.nla import calc_cblw_matrix, get_mfl_bigram_score_en
+from infra.scoring import NGramScorer, ngram_scorer_en
+from infra.stats import calc_stats, decode_letters, letter_codes
 from infra.string import all_string_indices, split_every
+from infra.text import TextBuffer
 from infra.utils import reverse_sequence
+from infra.word_search import WordCoverage, word_fitness_batch_en
 
 
 def get_encoding_mapping(key: str) -> Tuple[int, ...]:
@@ -91,17 +116,20 @@ def columnar_decode_shuffle(data: IndexableT, key: str) -> IndexableT:
     return [data[src_idx] for src_idx in get_decoding_mapping(key)]
 
 
-def columnar_decode(encoded: str, key: str) -> str:
+def columnar_decode(encoded: Union[str, TextBuffer], key: str) -> str:
     """
     Apply a columnar transposition cipher for deciphering.
 
-    :param encoded: The text to be decoded.
+    :param encoded: The text to be decoded, or its text buffer.
     :param key: The encoding key.
     :return: The decoded string.
 
     >>> columnar_decode("stis ei hat st", "somekey")
     'this is a test'
+    >>> columnar_decode(TextBuffer.from_text("HLOOLELWRD"), "AB")
+    'HELLOWORLD'
     """
+    encoded = str(encoded)
     split_data = split_every(encoded, (len(encoded) + len(key) - 1) // len(key))
     columns = columnar_decode_shuffle(split_data, key[: min(len(key), len(split_data))])
     rows = max(len(column) for column in columns)
@@ -399,6 +427,67 @@ def walk_path(
         raise ValueError
 
 
+@lru_cache(maxsize=None)
+def walk_indices(path: GridPath, origin: GridPathOrigin, rows: int, cols: int) -> Tuple[int, ...]:
+    """
+    Compile a path walk into row-major cell indices, see `walk_path`.
+
+    :param path: The path type.
+    :param origin: Where to start walking.
+    :param rows: Grid rows.
+    :param cols: Grid columns.
+    :return: The index of the cell visited in each step.
+
+    >>> walk_indices(GridPath.SnakeColumns, GridPathOrigin.TopLeft, 2, 3)
+    (0, 3, 4, 1, 2, 5)
+    """
+    return tuple(r * cols + c for r, c in walk_path(path, origin, rows, cols))
+
+
+@lru_cache(maxsize=None)
+def grid_transform_indices(
+    rows: int,
+    cols: int,
+    output_path: GridPath,
+    output_origin: GridPathOrigin,
+    input_path: GridPath,
+    input_origin: GridPathOrigin,
+) -> Tuple[int, ...]:
+    """
+    Compose writing text into a grid and reading it back into a single permutation, see `transform_text_with_grid`.
+
+    :param rows: Grid rows.
+    :param cols: Grid columns.
+    :param output_path: How to write the initial text into the grid.
+    :param output_origin: Where to start walking when writing text into the grid.
+    :param input_path: How to read the text back from the grid.
+    :param input_origin: Where to start walking when reading text from the grid.
+    :return: The text index of each transformed character.
+
+    >>> grid_transform_indices(2, 3, GridPath.Rows, GridPathOrigin.TopLeft, GridPath.Columns, GridPathOrigin.TopLeft)
+    (0, 3, 1, 4, 2, 5)
+    """
+    text_index_of_cell = [0] * (rows * cols)
+    for text_index, cell in enumerate(walk_indices(output_path, output_origin, rows, cols)):
+        text_index_of_cell[cell] = text_index
+    return tuple(map(text_index_of_cell.__getitem__, walk_indices(input_path, input_origin, rows, cols)))
+
+
+@lru_cache(maxsize=4096)
+def _grid_gather(
+    rows: int,
+    cols: int,
+    output_path: GridPath,
+    output_origin: GridPathOrigin,
+    input_path: GridPath,
+    input_origin: GridPathOrigin,
+    blocks: int,
+) -> Callable[[str], Iterable[str]]:
+    indices = grid_transform_indices(rows, cols, output_path, output_origin, input_path, input_origin)
+    grid_size = rows * cols
+    return itemgetter(*(offset + index for offset in range(0, blocks * grid_size, grid_size) for index in indices))
+
+
 def text_to_grid(rows: int, cols: int, text: str, path: GridPath, origin: GridPathOrigin) -> List[List[str]]:
     """
     Write text into a grid.
@@ -462,35 +551,128 @@ def transform_text_with_grid(
     :return: The transformed text.
     """
     grid_size = cols * rows
-    result = ""
-    for pos in range(0, len(text), grid_size):
-        partial = text[pos : pos + grid_size].ljust(grid_size, null_char)
-        grid = text_to_grid(rows, cols, partial, output_path, output_origin)
-        result += grid_to_text(grid, input_path, input_origin)
-    return result
-
-
-def word_fitness_en(text: str, min_word_length: int = 3, max_word_length: int = 12) -> float:
+    blocks = -(-len(text) // grid_size)
+    if blocks == 0:
+        return ""
+    gather = _grid_gather(rows, cols, output_path, output_origin, input_path, input_origin, blocks)
+    return "".join(gather(text.ljust(blocks * grid_size, null_char)))
+
+
+def word_fitness_en(
+    text: Union[str, TextBuffer],
+    min_word_length: int = 3,
+    max_word_length: int = 12,
+    coverage: WordCoverage = WordCoverage.Greedy,
+) -> float:
     """
     Calculate a text fitness by searching for known dictionary words.
 
-    :param text: The text to scan.
+    :param text: The text to scan, or its text buffer.
     :param min_word_length: The minimum word length to consider.
     :param max_word_length: The maximum word length to consider.
-    :return: Text length divided by amount of matching words.
-    """
-    matching_chars = 0
-    text_length = len(text)
-    text = text.upper()
-    for pos in range(text_length - min_word_length + 1):
-        for word_size in range(min_word_length, max_word_length + 1):
-            if pos + word_size >= text_length:
-                break
-            if text[pos : pos + word_size] in dict_std_en:
-                matching_chars += word_size
-                # Advance to next word
-                pos += word_size - 1
-    return max(1, matching_chars) / text_length
+    :param coverage: How to count the characters covered by words.
+    :return: Amount of characters covered by matching words divided by text length.
+
+    >>> word_fitness_en("xxhelloxx"), word_fitness_en("xxhelloxx", coverage=WordCoverage.Maximal)
+    (0.5555555555555556, 0.5555555555555556)
+    >>> word_fitness_en(TextBuffer.from_text("xx hello xx"))
+    0.5555555555555556
+    """
+    return word_fitness_batch_en([text], min_word_length, max_word_length, coverage)[0]
+
+
+PathResult = Tuple[float, str, GridPath, GridPathOrigin, GridPath, GridPathOrigin]
+BoundedFitness = Callable[[str, float], Optional[float]]
+
+
+def _find_best_paths_shard(
+    text: str,
+    rows: int,
+    cols: int,
+    combinations: Sequence[Tuple[GridPath, GridPathOrigin, GridPath, GridPathOrigin]],
+    first_index: int,
+    fitness_fn: Callable[[str], float],
+    bounded_fitness_fn: Optional[BoundedFitness],
+    max_results: int,
+) -> List[Tuple[float, int, PathResult]]:
+    # Min-heap of the best results, keyed by fitness and negated index so earlier combinations win ties
+    heap: List[Tuple[float, int, PathResult]] = []
+    for index, (output_path, output_origin, input_path, input_origin) in enumerate(combinations, first_index):
+        transformed = transform_text_with_grid(rows, cols, text, output_path, output_origin, input_path, input_origin)
+        if bounded_fitness_fn is None:
+            fitness = fitness_fn(transformed)
+        else:
+            bounded = bounded_fitness_fn(transformed, heap[0][0] if len(heap) == max_results else -math.inf)
+            if bounded is None:
+                continue
+            fitness = bounded
+        entry = (fitness, -index, (fitness, transformed, input_path, input_origin, output_path, output_origin))
+        if len(heap) < max_results:
+            heappush(heap, entry)
+        elif fitness > heap[0][0]:
+            heapreplace(heap, entry)
+    return heap
+
+
+def find_best_paths(
+    text: str,
+    rows: int,
+    cols: int,
+    fitness_fn: Callable[[str], float] = word_fitness_en,
+    max_results: int = 10,
+    processes: int = 1,
+    bounded_fitness_fn: Optional[BoundedFitness] = None,
+) -> List[PathResult]:
+    """
+    Find the best path types for transforming a text through a grid.
+
+    :param text: The text to transform.
+    :param rows: The rows in the grid.
+    :param cols: The columns in the grid.
+    :param fitness_fn: A fitness scoring function.
+    :param max_results: The number of results to keep.
+    :param processes: The number of worker processes; if greater than 1, the path combinations are split between
+                      them, and the fitness functions must be picklable.
+    :param bounded_fitness_fn: A fitness function used instead of `fitness_fn`, receiving the fitness a text needs to
+                               exceed to be kept; it may return None as soon as it knows the text will not exceed it.
+    :return: Tuples of the fitness score, the transformed text, the input path type and origin, and the output path
+             type and origin, best first.
+
+    >>> from infra.scoring import ngram_scorer_en
+    >>> text = transform_text_with_grid(
+    ...     3, 4, "WEATTACKATDA", GridPath.Rows, GridPathOrigin.TopLeft, GridPath.SpiralCwIn, GridPathOrigin.TopLeft,
+    ... )
+    >>> results = find_best_paths(text, 3, 4, bounded_fitness_fn=ngram_scorer_en(3).bounded_fitness, max_results=3)
+    >>> len(results), results[0][1:4]
+    (3, ('WEATTACKATDA', <GridPath.Rows: 1>, <GridPathOrigin.TopLeft: 1>))
+    """
+    assert max_results >= 1
+    assert calc_stats(text).letter_count != 0
+
+    combinations = list(product(GridPath, GridPathOrigin, GridPath, GridPathOrigin))
+    if processes <= 1:
+        shards = [
+            _find_best_paths_shard(text, rows, cols, combinations, 0, fitness_fn, bounded_fitness_fn, max_results),
+        ]
+    else:
+        shard_size = -(-len(combinations) // processes)
+        starts = range(0, len(combinations), shard_size)
+        with ProcessPoolExecutor(processes) as executor:
+            shards = list(
+                executor.map(
+                    _find_best_paths_shard,
+                    repeat(text),
+                    repeat(rows),
+                    repeat(cols),
+                    (combinations[start : start + shard_size] for start in starts),
+                    starts,
+                    repeat(fitness_fn),
+                    repeat(bounded_fitness_fn),
+                    repeat(max_results),
+                ),
+            )
+
+    return [entry[2] for entry in nlargest(max_results, chain.from_iterable(shards))]
 
 
 def find_best_path(
@@ -498,7 +680,7 @@ def find_best_path(
     rows: int,
     cols: int,
     fitness_fn: Callable[[str], float] = word_fitness_en,
-) -> Tuple[float, str, GridPath, GridPathOrigin, GridPath, GridPathOrigin]:
+) -> PathResult:
     """
     Find the best path types for transforming a text through a grid.
 
@@ -508,44 +690,988 @@ def find_best_path(
     :param fitness_fn: A fitness scoring function.
     :return: A tuple of the fitness score, the transformed text, the input path type and the output path type.
     """
-    text_stats: Stats
-    best_fitness: float
-    current_fitness: float
-
-    # Calculate the stats
-    text_stats = calc_stats(text)
-
-    # Check for zero length text
-    assert text_stats.letter_count != 0
-
-    best_fitness = 0.0
-    best_text = None
-    best_input_path = None
-    best_input_origin = None
-    best_output_path = None
-    best_output_origin = None
-
-    for output_path in GridPath:
-        for output_origin in GridPathOrigin:
-            for input_path in GridPath:
-                for input_origin in GridPathOrigin:
-                    transformed = transform_text_with_grid(
-                        rows,
-                        cols,
-                        text,
-                        output_path,
-                        output_origin,
-                        input_path,
-                        input_origin,
-                    )
-                    current_fitness = fitness_fn(transformed)
-                    if current_fitness > best_fitness:
-                        best_fitness = current_fitness
-                        best_text = transformed
-                        best_input_path = input_path
-                        best_input_origin = input_origin
-                        best_output_path = output_path
-                        best_output_origin = output_origin
-
-    assert best_text is not None
-    return best_fitness, best_text, best_input_path, best_input_origin, best_output_path, best_output_origin
+    return find_best_paths(text, rows, cols, fitness_fn, max_results=1)[0]
+
+
+RouteResult = Tuple[int, int, PathResult]
+
+
+def grid_shapes(text_length: int, min_side: int = 2, max_padding: Optional[int] = None) -> List[Tuple[int, int]]:
+    """
+    Get the grid shapes a text fits into.
+
+    :param text_length: The text length.
+    :param min_side: The minimum number of rows and columns.
+    :param max_padding: The maximum number of null characters needed to fill the grid, defaults to less than the
+                        shorter grid side.
+    :return: The rows and columns of each shape.
+
+    >>> grid_shapes(12)
+    [(2, 6), (3, 4), (4, 3), (6, 2)]
+    >>> grid_shapes(11)
+    [(2, 6), (3, 4), (4, 3), (6, 2)]
+    >>> grid_shapes(11, max_padding=4)
+    [(2, 6), (2, 7), (3, 4), (3, 5), (4, 3), (5, 3), (6, 2), (7, 2)]
+    """
+    result = []
+    for rows in range(min_side, text_length + 1):
+        cols = max(min_side, -(-text_length // rows))
+        while True:
+            padding = rows * cols - text_length
+            if padding > (min(rows, cols) - 1 if max_padding is None else max_padding):
+                break
+            result.append((rows, cols))
+            cols += 1
+    return result
+
+
+# Writing the text along each path and reading it back by rows or by columns. Any other read path mostly joins
+# horizontal or vertical neighbours too, so these 64 of the 1024 combinations are enough to rank the shapes.
+_route_prune_combinations = [
+    (output_path, output_origin, input_path, GridPathOrigin.TopLeft)
+    for output_path, output_origin in product(GridPath, GridPathOrigin)
+    for input_path in (GridPath.Rows, GridPath.Columns)
+]
+
+
+def _route_prune_score(text: str, rows: int, cols: int, prune_fn: Callable[[str], float]) -> float:
+    return max(
+        prune_fn(transform_text_with_grid(rows, cols, text, *combination)) for combination in _route_prune_combinations
+    )
+
+
+def find_best_routes(
+    text: str,
+    fitness_fn: Callable[[str], float] = word_fitness_en,
+    max_results: int = 10,
+    max_shapes: Optional[int] = 5,
+    min_side: int = 2,
+    max_padding: Optional[int] = None,
+    null_char: str = "_",
+    prune_fn: Callable[[str], float] = get_mfl_bigram_score_en,
+    bounded_fitness_fn: Optional[BoundedFitness] = None,
+    processes: Optional[int] = None,
+) -> List[RouteResult]:
+    """
+    Find the best grid shapes and path types for transforming a text of unknown grid size.
+
+    All shapes from `grid_shapes` are ranked by the best `prune_fn` score of the text written along each path and
+    read back by rows or by columns, i.e. 64 of the 1024 path combinations. Only the best `max_shapes` are scored with
+    `find_best_paths`, the text being padded with `null_char` to fill the grid. The compiled path permutations are
+    cached per shape, so they are shared between both stages.
+
+    :param text: The text to transform.
+    :param fitness_fn: A fitness scoring function.
+    :param max_results: The number of results to keep.
+    :param max_shapes: The number of shapes to score after pruning, or None to score all of them.
+    :param min_side: The minimum number of rows and columns.
+    :param max_padding: The maximum number of null characters, see `grid_shapes`.
+    :param null_char: The character used for padding.
+    :param prune_fn: A cheap fitness function used for pruning shapes.
+    :param bounded_fitness_fn: A bounded fitness function used instead of `fitness_fn`, see `find_best_paths`.
+    :param processes: The number of worker processes, defaults to the number of CPUs; if greater than 1, the shapes
+                      are split between them, and the fitness functions must be picklable.
+    :return: Tuples of the grid rows and columns and the `find_best_paths` result, best first.
+
+    >>> text = transform_text_with_grid(
+    ...     3, 5, "WEAREDISCOVERED", GridPath.Rows, GridPathOrigin.TopLeft, GridPath.Columns, GridPathOrigin.TopLeft,
+    ... )
+    >>> rows, cols, (fitness, transformed, *paths) = find_best_routes(text, processes=1)[0]
+    >>> rows, cols, transformed
+    (3, 5, 'WEAREDISCOVERED')
+    """
+    shapes = grid_shapes(len(text), min_side, max_padding)
+    padded = [text.ljust(rows * cols, null_char) for rows, cols in shapes]
+    processes = processes or os.cpu_count() or 1
+
+    def score_shapes(map_fn: Callable[..., Iterable[Any]]) -> List[RouteResult]:
+        selected = list(range(len(shapes)))
+        if max_shapes is not None and len(shapes) > max_shapes:
+            prune_scores = list(
+                map_fn(
+                    _route_prune_score,
+                    padded,
+                    (rows for rows, _ in shapes),
+                    (cols for _, cols in shapes),
+                    repeat(prune_fn),
+                ),
+            )
+            selected = sorted(sorted(selected, key=prune_scores.__getitem__, reverse=True)[:max_shapes])
+
+        shape_results = map_fn(
+            find_best_paths,
+            (padded[index] for index in selected),
+            (shapes[index][0] for index in selected),
+            (shapes[index][1] for index in selected),
+            repeat(fitness_fn),
+            repeat(max_results),
+            repeat(1),
+            repeat(bounded_fitness_fn),
+        )
+        results = [
+            (shapes[index][0], shapes[index][1], result)
+            for index, results in zip(selected, shape_results)
+            for result in results
+        ]
+        return sorted(results, key=lambda result: result[2][0], reverse=True)[:max_results]
+
+    if processes == 1 or len(shapes) <= 1:
+        return score_shapes(map)
+
+    with ProcessPoolExecutor(processes) as executor:
+        return score_shapes(executor.map)
+
+
+ScoreMatrix = Sequence[Sequence[float]]
+
+
+def _order_score(matrix: ScoreMatrix, order: Sequence[int]) -> float:
+    return sum(matrix[a][b] for a, b in zip(order, order[1:]))
+
+
+def _greedy_order(matrix: ScoreMatrix, start: int) -> List[int]:
+    order = [start]
+    remaining = set(range(len(matrix))) - {start}
+    while remaining:
+        row = matrix[order[-1]]
+        best = max(sorted(remaining), key=lambda column: row[column])
+        order.append(best)
+        remaining.remove(best)
+    return order
+
+
+def _best_reversal(matrix: ScoreMatrix, order: List[int]) -> Tuple[float, List[int]]:
+    """Find the best 2-opt move, i.e. the reversal of a segment."""
+    n = len(order)
+    edges = [matrix[a][b] for a, b in zip(order, order[1:])]
+    # Difference between the summed backward and forward edges up to each position
+    reversal_gains = [0.0]
+    for a, b in zip(order, order[1:]):
+        reversal_gains.append(reversal_gains[-1] + matrix[b][a] - matrix[a][b])
+
+    best_delta = 0.0
+    best_order = order
+    for i in range(n - 1):
+        # Reversing order[i..j] for j = i+1..n-1
+        deltas = list(map(sub, reversal_gains[i + 1 :], repeat(reversal_gains[i])))
+        if i > 0:
+            row = matrix[order[i - 1]]
+            deltas = list(map(add, deltas, map(sub, map(row.__getitem__, order[i + 1 :]), repeat(row[order[i]]))))
+        right = list(map(sub, map(matrix[order[i]].__getitem__, order[i + 2 :]), edges[i + 1 :]))
+        deltas = list(map(add, deltas, right + [0.0]))
+
+        k = max(range(len(deltas)), key=deltas.__getitem__)
+        if deltas[k] > best_delta:
+            j = i + 1 + k
+            best_delta = deltas[k]
+            best_order = order[:i] + order[i : j + 1][::-1] + order[j + 1 :]
+    return best_delta, best_order
+
+
+def _best_segment_move(matrix: ScoreMatrix, order: List[int], max_segment_length: int = 3) -> Tuple[float, List[int]]:
+    """Find the best Or-opt move, i.e. moving a short segment to another position."""
+    n = len(order)
+    columns = [list(column) for column in zip(*matrix)]
+    edges = [matrix[a][b] for a, b in zip(order, order[1:])]
+
+    best_delta = 0.0
+    best_order = order
+    for length in range(1, min(max_segment_length, n - 1) + 1):
+        for i in range(n - length + 1):
+            segment = order[i : i + length]
+            rest = order[:i] + order[i + length :]
+            first, last = segment[0], segment[-1]
+
+            removal = 0.0
+            if i > 0:
+                removal -= edges[i - 1]
+            if i + length < n:
+                removal -= edges[i + length - 1]
+            if 0 < i < n - length:
+                bridge = matrix[order[i - 1]][order[i + length]]
+                removal += bridge
+                rest_edges = edges[: i - 1] + [bridge] + edges[i + length :]
+            else:
+                rest_edges = edges[length:] if i == 0 else edges[: i - 1]
+
+            # Inserting before rest[k] for k = 0..len(rest), skipping the removed position
+            incoming = list(map(columns[first].__getitem__, rest))
+            outgoing = list(map(matrix[last].__getitem__, rest))
+            deltas = [outgoing[0], *map(sub, map(add, incoming, outgoing[1:]), rest_edges), incoming[-1]]
+            deltas[i] = -math.inf
+
+            k = max(range(len(deltas)), key=deltas.__getitem__)
+            if removal + deltas[k] > best_delta:
+                best_delta = removal + deltas[k]
+                best_order = rest[:k] + segment + rest[k:]
+    return best_delta, best_order
+
+
+def _improve_order(matrix: ScoreMatrix, order: List[int]) -> List[int]:
+    """Apply the best 2-opt or Or-opt move until there is no improvement."""
+    while True:
+        reversal_delta, reversal_order = _best_reversal(matrix, order)
+        move_delta, move_order = _best_segment_move(matrix, order)
+        if max(reversal_delta, move_delta) <= 1e-12:
+            return order
+        order = reversal_order if reversal_delta >= move_delta else move_order
+
+
+def read_columns(columns: Sequence[str], order: Sequence[int]) -> str:
+    """
+    Read the rows of columns placed side by side in a given order, skipping columns that are too short.
+
+    :param columns: The columns.
+    :param order: The order of the column indices.
+    :return: The text.
+
+    >>> read_columns(("HLOOL", "ELWRD"), (0, 1))
+    'HELLOWORLD'
+    >>> read_columns(("HLO", "EL"), (1, 0))
+    'EHLLO'
+    """
+    rows = max((len(column) for column in columns), default=0)
+    return "".join(columns[c][i] for i in range(rows) for c in order if i < len(columns[c]))
+
+
+def solve_column_order(
+    text: str,
+    split_size: int,
+    max_results: int = 10,
+    score_matrix_fn: Callable[[Sequence[str]], ScoreMatrix] = calc_cblw_matrix,
+) -> List[Tuple[float, Tuple[int, ...], str]]:
+    """
+    Find the best orderings of the columns of a transposition.
+
+    The text is split into columns like in `infra.nla.calc_cblw_scores`. The pairwise column scores are calculated
+    once, then greedy chains are built from every column, and the best ones are improved with 2-opt and Or-opt moves
+    on the score matrix.
+
+    :param text: The text to split into columns.
+    :param split_size: The column length.
+    :param max_results: The maximum number of results.
+    :param score_matrix_fn: Calculates the scores of placing each column left of each other column.
+    :return: Tuples of the summed adjacent pair score, the column order and the text read row by row, best first.
+
+    >>> solve_column_order("HLOOLELWRD", 5)
+    [(2.1000000000000005, (0, 1), 'HELLOWORLD'), (1.6800000000000002, (1, 0), 'EHLLWORODL')]
+    """
+    columns = split_every(text, split_size)
+    if not columns:
+        return []
+
+    matrix = score_matrix_fn(columns)
+    greedy_orders = {tuple(_greedy_order(matrix, start)) for start in range(len(columns))}
+    orders: Set[Tuple[int, ...]] = set(greedy_orders)
+    for greedy in sorted(greedy_orders, key=lambda order: -_order_score(matrix, order))[:max_results]:
+        orders.add(tuple(_improve_order(matrix, list(greedy))))
+
+    ranked = sorted(orders, key=lambda order: (-_order_score(matrix, order), order))
+    return [(_order_score(matrix, order), order, read_columns(columns, order)) for order in ranked[:max_results]]
+
+
+def _columnar_layout(text_length: int, key_length: int) -> Tuple[int, int]:
+    """Get the chunk size and the number of chunks `columnar_decode` splits a text into."""
+    chunk_size = -(-text_length // key_length)
+    return chunk_size, -(-text_length // chunk_size)
+
+
+def columnar_key_from_order(order: Sequence[int]) -> str:
+    """
+    Get a key whose decoding mapping is a given order of the encoded chunks.
+
+    :param order: The chunk indices in decoded column order.
+    :return: The key.
+
+    >>> columnar_key_from_order((0, 3, 1, 2, 4, 5))
+    'ADBCEF'
+    >>> get_decoding_mapping(columnar_key_from_order((0, 3, 1, 2, 4, 5)))
+    (0, 3, 1, 2, 4, 5)
+    """
+    assert len(order) <= 26
+    return "".join(chr(ord("A") + chunk) for chunk in order)
+
+
+_Segment = Tuple[int, int, bool]
+"""A slice `[start:stop]` of a chunk order, and whether it is reversed."""
+
+
+class ColumnarScorer:
+    """
+    Score orders of the chunks of a columnar transposition by the summed trigram log-probabilities of the decoded text.
+
+    The text is split into chunks like in `columnar_decode`, i.e. only the last chunk may be shorter. The trigram
+    scores of placing each chunk next to each two other chunks, within rows and across row ends, are calculated once,
+    so scoring an order only adds up a few table entries per chunk. Trigrams containing non-letters are ignored.
+
+    >>> from infra.scoring import ngram_scorer_en
+    >>> scorer = ColumnarScorer("EVLNHAACDTNAESEAAEROFODWDEECIYWIREED", 6, ngram_scorer_en(3))
+    >>> scorer.score((5, 2, 1, 3, 0, 4)) > scorer.score((0, 1, 2, 3, 4, 5))
+    True
+    >>> scorer.decode((5, 2, 1, 3, 0, 4))
+    'WEAREDISCOVEREDFLEEATONCEANDHIDEAWAY'
+    """
+
+    def __init__(self, encoded: str, key_length: int, trigram_scorer: NGramScorer):
+        """
+        Calculate the chunk triple scores.
+
+        :param encoded: The encoded text.
+        :param key_length: The key length.
+        :param trigram_scorer: The trigram scorer providing the log-probabilities.
+        """
+        assert trigram_scorer.n == 3
+        chunk_size, chunk_count = _columnar_layout(len(encoded), key_length)
+        self.chunks = split_every(encoded, chunk_size)
+        assert len(self.chunks) == chunk_count >= 3
+
+        log_probabilities = trigram_scorer.log_probabilities
+        codes = [[ord(c) - ord("A") if "A" <= c <= "Z" else -1 for c in chunk.upper()] for chunk in self.chunks]
+
+        def triple_scores(offset_b: int, offset_c: int, start: int, stop: int) -> List[List[List[float]]]:
+            """Sum the trigrams of `a[i]`, `b[i + offset_b]` and `c[i + offset_c]` for `start <= i < stop`."""
+            firsts = [code[start:stop] for code in codes]
+            seconds = [code[start + offset_b : stop + offset_b] for code in codes]
+            thirds = [code[start + offset_c : stop + offset_c] for code in codes]
+            result = []
+            for a in firsts:
+                rows = []
+                for b in seconds:
+                    prefixes = [(x * 26 + y) * 26 if x >= 0 and y >= 0 else -1 for x, y in zip(a, b)]
+                    scores = [
+                        sum(log_probabilities[p + z] for p, z in zip(prefixes, c) if p >= 0 and z >= 0) for c in thirds
+                    ]
+                    rows.append(scores)
+                result.append(rows)
+            return result
+
+        # The last chunk is missing from rows `short_length` and below, which join the neighbouring chunks instead.
+        # Across row ends, the last two chunks of a row are followed by the first chunk of the next row, and the last
+        # chunk of a row by the first two chunks of the next row.
+        self._short_chunk = chunk_count - 1
+        short_length = len(self.chunks[-1])
+        self._irregular = short_length < chunk_size
+        self._triples = triple_scores(0, 0, 0, short_length)
+        self._end_triples = triple_scores(0, 1, 0, short_length - 1)
+        self._start_triples = triple_scores(1, 1, 0, short_length - 1)
+        if self._irregular:
+            self._short_triples = triple_scores(0, 0, short_length, chunk_size)
+            self._short_end_triples = triple_scores(0, 1, short_length, chunk_size - 1)
+            self._short_start_triples = triple_scores(1, 1, short_length, chunk_size - 1)
+            self._last_full_end_triples = triple_scores(0, 1, short_length - 1, short_length)
+            self._last_full_start_triples = triple_scores(1, 1, short_length - 1, short_length)
+
+    def score(self, order: Sequence[int]) -> float:
+        """
+        Calculate the summed trigram log-probabilities of the text decoded with an order.
+
+        :param order: The chunk indices in decoded column order.
+        :return: The score.
+        """
+        triples = self._triples
+        result = sum(triples[a][b][c] for a, b, c in zip(order, order[1:], order[2:]))
+        result += self._end_triples[order[-2]][order[-1]][order[0]] + self._start_triples[order[-1]][order[0]][order[1]]
+        if self._irregular:
+            short = [chunk for chunk in order if chunk != self._short_chunk]
+            triples = self._short_triples
+            result += sum(triples[a][b][c] for a, b, c in zip(short, short[1:], short[2:]))
+            result += self._short_end_triples[short[-2]][short[-1]][short[0]]
+            result += self._short_start_triples[short[-1]][short[0]][short[1]]
+            result += self._last_full_end_triples[order[-2]][order[-1]][short[0]]
+            result += self._last_full_start_triples[order[-1]][short[0]][short[1]]
+        return result
+
+    def decode(self, order: Sequence[int]) -> str:
+        """
+        Decode the text with an order.
+
+        :param order: The chunk indices in decoded column order.
+        :return: The decoded text.
+        """
+        return read_columns(self.chunks, order)
+
+    def _score_segments(self, edges: "_OrderEdges", segments: Sequence[_Segment]) -> float:
+        """
+        Score the order made of segments of another order, using its prefix sums.
+
+        Only the triples across the joins of the segments and the row ends are looked up, so this takes constant time
+        per segment instead of linear time in the key length.
+        """
+        result, first, second, before_last, last = _join_segments(
+            self._triples,
+            edges.forward,
+            edges.backward,
+            edges.order,
+            segments,
+        )
+        result += self._end_triples[before_last][last][first] + self._start_triples[last][first][second]
+        if self._irregular:
+            # The same, over the order without the short chunk
+            position = edges.short_position
+            short_segments = [
+                (start - (start > position), stop - (stop > position), reverse) for start, stop, reverse in segments
+            ]
+            short_result, short_first, short_second, short_before_last, short_last = _join_segments(
+                self._short_triples,
+                edges.short_forward,
+                edges.short_backward,
+                edges.short,
+                [segment for segment in short_segments if segment[0] < segment[1]],
+            )
+            result += short_result
+            result += self._short_end_triples[short_before_last][short_last][short_first]
+            result += self._short_start_triples[short_last][short_first][short_second]
+            result += self._last_full_end_triples[before_last][last][short_first]
+            result += self._last_full_start_triples[last][short_first][short_second]
+        return result
+
+
+def _triple_prefix_sums(triples: List[List[List[float]]], order: Sequence[int]) -> Tuple[List[float], List[float]]:
+    """Get the prefix sums of the triple scores along an order, read forwards and backwards."""
+    windows = list(zip(order, order[1:], order[2:]))
+    return (
+        list(accumulate((triples[a][b][c] for a, b, c in windows), initial=0.0)),
+        list(accumulate((triples[c][b][a] for a, b, c in windows), initial=0.0)),
+    )
+
+
+class _OrderEdges:
+    """The prefix sums of the chunk triple scores along an order, see `ColumnarScorer._score_segments`."""
+
+    __slots__ = ("order", "forward", "backward", "short", "short_position", "short_forward", "short_backward")
+
+    def __init__(self, scorer: ColumnarScorer, order: List[int]):
+        self.order = order
+        self.forward, self.backward = _triple_prefix_sums(scorer._triples, order)
+        if scorer._irregular:
+            self.short_position = order.index(scorer._short_chunk)
+            self.short = order[: self.short_position] + order[self.short_position + 1 :]
+            self.short_forward, self.short_backward = _triple_prefix_sums(scorer._short_triples, self.short)
+
+
+def _join_segments(
+    triples: List[List[List[float]]],
+    forward: List[float],
+    backward: List[float],
+    sequence: List[int],
+    segments: Sequence[_Segment],
+) -> Tuple[float, int, int, int, int]:
+    """
+    Sum the triple scores along segments of a sequence joined together.
+
+    The triples within each segment are summed from the prefix sums of the sequence, and only the triples ending at the
+    first two chunks of each segment are looked up.
+
+    :return: The sum, the first two chunks and the last two chunks of the joined sequence.
+    """
+    result = 0.0
+    first = second = before_last = last = -1
+    for start, stop, reverse in segments:
+        length = stop - start
+        if reverse:
+            if length > 2:
+                result += backward[stop - 2] - backward[start]
+            head = (sequence[stop - 1], sequence[stop - 2]) if length > 1 else (sequence[start],)
+            tail = (sequence[start + 1], sequence[start]) if length > 1 else None
+        else:
+            if length > 2:
+                result += forward[stop - 2] - forward[start]
+            head = sequence[start : min(start + 2, stop)]
+            tail = (sequence[stop - 2], sequence[stop - 1]) if length > 1 else None
+        for chunk in head:
+            if before_last >= 0:
+                result += triples[before_last][last][chunk]
+            elif last >= 0:
+                second = chunk
+            else:
+                first = chunk
+            before_last, last = last, chunk
+        if tail is not None:
+            before_last, last = tail
+    return result, first, second, before_last, last
+
+
+def _apply_segments(order: List[int], segments: Sequence[_Segment]) -> List[int]:
+    """Join segments of an order."""
+    result: List[int] = []
+    for start, stop, reverse in segments:
+        result.extend(order[stop - 1 : start - 1 if start else None : -1] if reverse else order[start:stop])
+    return result
+
+
+def _swap_segments(n: int, i: int, j: int) -> List[_Segment]:
+    """Get the segments swapping the chunks at `i < j`."""
+    segments = [(0, i, False), (j, j + 1, False), (i + 1, j, False), (i, i + 1, False), (j + 1, n, False)]
+    return [segment for segment in segments if segment[0] < segment[1]]
+
+
+def _block_move_segments(n: int, i: int, j: int, k: int) -> List[_Segment]:
+    """Get the segments moving the block `[i:j]` to position `k` of the remaining chunks."""
+    if k <= i:
+        segments = [(0, k, False), (i, j, False), (k, i, False), (j, n, False)]
+    else:
+        k += j - i
+        segments = [(0, i, False), (j, k, False), (i, j, False), (k, n, False)]
+    return [segment for segment in segments if segment[0] < segment[1]]
+
+
+def _random_columnar_move(n: int, rng: random.Random) -> List[_Segment]:
+    """Swap two chunks, reverse a block or move a block to another position."""
+    i, j = sorted(rng.sample(range(n + 1), 2))
+    move = rng.randrange(3)
+    if move == 0 and j < n:
+        return _swap_segments(n, i, j)
+    if move == 1:
+        return [segment for segment in ((0, i, False), (i, j, True), (j, n, False)) if segment[0] < segment[1]]
+    return _block_move_segments(n, i, j, rng.randrange(n - (j - i) + 1))
+
+
+def _columnar_neighbours(n: int) -> Iterator[List[_Segment]]:
+    """Generate all moves of one swap or one single-chunk move."""
+    for i in range(n):
+        for j in range(i + 1, n):
+            yield _swap_segments(n, i, j)
+    for i in range(n):
+        for k in range(n):
+            if k != i:
+                yield _block_move_segments(n, i, i + 1, k)
+
+
+def _anneal_columnar_order(
+    scorer: ColumnarScorer,
+    seed: int,
+    iterations: int,
+    temperature: float,
+) -> Tuple[float, Tuple[int, ...]]:
+    """Search a chunk order with simulated annealing from a random start, then climb to the nearest local optimum."""
+    rng = random.Random(seed)
+    n = len(scorer.chunks)
+    order = list(range(n))
+    rng.shuffle(order)
+    edges = _OrderEdges(scorer, order)
+    score = scorer.score(order)
+    best_score, best_order = score, order
+
+    # The temperature is relative to the mean score per chunk pair, and cools down geometrically to a hundredth
+    scale = abs(score) / n * temperature
+    cooling = 0.01 ** (1 / max(1, iterations))
+    for _ in range(iterations):
+        segments = _random_columnar_move(n, rng)
+        candidate_score = scorer._score_segments(edges, segments)
+        delta = candidate_score - score
+        if delta >= 0 or (scale > 0 and rng.random() < math.exp(delta / scale)):
+            order, score = _apply_segments(order, segments), candidate_score
+            edges = _OrderEdges(scorer, order)
+            if score > best_score:
+                best_score, best_order = score, order
+        scale *= cooling
+
+    edges = _OrderEdges(scorer, best_order)
+    improved = True
+    while improved:
+        improved = False
+        for segments in _columnar_neighbours(n):
+            candidate_score = scorer._score_segments(edges, segments)
+            if candidate_score > best_score + 1e-9:
+                best_score, best_order = candidate_score, _apply_segments(best_order, segments)
+                edges = _OrderEdges(scorer, best_order)
+                improved = True
+                break
+    return scorer.score(best_order), tuple(best_order)
+
+
+def _search_columnar_order(
+    encoded: str,
+    key_length: int,
+    trigram_scorer: NGramScorer,
+    seeds: Sequence[int],
+    iterations: int,
+    temperature: float,
+) -> List[Tuple[float, Tuple[int, ...]]]:
+    chunk_count = _columnar_layout(len(encoded), key_length)[1]
+    if chunk_count < 3:
+        # Too few chunks to form triples, but few enough to try every order
+        return [(0.0, order) for order in permutations(range(chunk_count))]
+    scorer = ColumnarScorer(encoded, key_length, trigram_scorer)
+    return [_anneal_columnar_order(scorer, seed, iterations, temperature) for seed in seeds]
+
+
+def columnar_key_search(
+    encoded: Union[str, TextBuffer],
+    key_lengths: Iterable[int],
+    fitness_fn: Optional[Callable[[str], float]] = None,
+    max_results: int = 10,
+    restarts: int = 8,
+    iterations: int = 20000,
+    temperature: float = 0.05,
+    trigram_scorer: Optional[NGramScorer] = None,
+    seed: Optional[int] = None,
+    processes: Optional[int] = None,
+) -> List[Tuple[float, str, str]]:
+    """
+    Find the keys of a columnar transposition by simulated annealing over the chunk orders.
+
+    For each key length, the encoded text is split into chunks like in `columnar_decode`. Random chunk orders are
+    mutated by swapping chunks, reversing blocks and moving blocks, scored with a `ColumnarScorer`; a mutation only
+    looks up the trigrams across the joins it changes. Key lengths splitting the text the same way are searched once.
+    The best order of each restart is decoded and ranked with `fitness_fn`.
+
+    This algorithm is non-deterministic unless a seed is given.
+
+    :param encoded: The encoded text, or its text buffer.
+    :param key_lengths: The key lengths to try.
+    :param fitness_fn: A fitness function ranking the decoded texts, defaults to the English trigram fitness.
+    :param max_results: The maximum number of results.
+    :param restarts: The number of random restarts per key length.
+    :param iterations: The number of mutations per restart.
+    :param temperature: The initial annealing temperature, relative to the mean score per chunk; 0 for
+                        plain hill climbing.
+    :param trigram_scorer: The scorer used during the search, defaults to the English trigram frequencies.
+    :param seed: The random seed.
+    :param processes: The number of worker processes, defaults to the number of CPUs; if greater than 1, the restarts
+                      are split between them.
+    :return: Tuples of the fitness, the key and the decoded text, best first. The keys have one letter per chunk;
+             longer keys with the same prefix decode the same.
+
+    >>> encoded = columnar_encode("WEAREDISCOVEREDFLEEATONCEANDHIDEAWAY", "ZEBRAS")
+    >>> columnar_key_search(encoded, [6], restarts=2, iterations=1000, seed=1, processes=1)[0][1:]
+    ('FCBDAE', 'WEAREDISCOVEREDFLEEATONCEANDHIDEAWAY')
+    """
+    if isinstance(encoded, TextBuffer):
+        encoded = str(encoded)
+    fitness_fn = fitness_fn or ngram_scorer_en(3).fitness
+    trigram_scorer = trigram_scorer or ngram_scorer_en(3)
+    processes = processes or os.cpu_count() or 1
+    rng = random.Random(seed)
+
+    # Key lengths with the same layout decode the same
+    layouts = {}
+    for key_length in key_lengths:
+        layout = _columnar_layout(len(encoded), key_length)
+        if layout[1] > 1:
+            layouts.setdefault(layout, layout[1])
+
+    tasks = [
+        (key_length, [rng.getrandbits(64) for _ in range(count)])
+        for key_length in layouts.values()
+        for count in _split_evenly(restarts, processes)
+    ]
+    task_args = (
+        repeat(encoded),
+        (key_length for key_length, _ in tasks),
+        repeat(trigram_scorer),
+        (seeds for _, seeds in tasks),
+        repeat(iterations),
+        repeat(temperature),
+    )
+    if processes == 1:
+        task_results = list(map(_search_columnar_order, *task_args))
+    else:
+        with ProcessPoolExecutor(processes) as executor:
+            task_results = list(executor.map(_search_columnar_order, *task_args))
+
+    candidates = {}
+    for (key_length, _), results in zip(tasks, task_results):
+        chunks = split_every(encoded, _columnar_layout(len(encoded), key_length)[0])
+        for _, order in results:
+            key = columnar_key_from_order(order)
+            if key not in candidates:
+                text = read_columns(chunks, order)
+                candidates[key] = (fitness_fn(text), key, text)
+
+    return sorted(candidates.values(), key=lambda result: result[0], reverse=True)[:max_results]
+
+
+def _split_evenly(total: int, parts: int) -> List[int]:
+    """Split a number into at most `parts` non-zero, nearly equal parts."""
+    parts = max(1, min(total, parts))
+    return [total // parts + (1 if i < total % parts else 0) for i in range(parts)]
+
+
+def permutation_from_rank(rank: int, n: int) -> Tuple[int, ...]:
+    """
+    Get the permutation of `range(n)` with a given rank in lexicographic order, decoding its Lehmer code.
+
+    :param rank: The rank, from 0 to `n! - 1`.
+    :param n: The number of elements.
+    :return: The permutation.
+
+    >>> [permutation_from_rank(rank, 3) for rank in range(6)]
+    [(0, 1, 2), (0, 2, 1), (1, 0, 2), (1, 2, 0), (2, 0, 1), (2, 1, 0)]
+    """
+    assert 0 <= rank < math.factorial(n)
+    elements = list(range(n))
+    result = []
+    for position in reversed(range(n)):
+        index, rank = divmod(rank, math.factorial(position))
+        result.append(elements.pop(index))
+    return tuple(result)
+
+
+def permutations_in_rank_range(n: int, start: int, stop: int) -> Iterator[Tuple[int, ...]]:
+    """
+    Generate the permutations of `range(n)` with ranks from `start` to `stop` in lexicographic order.
+
+    Whole blocks of permutations sharing a prefix are generated by `itertools.permutations`, so the range does not
+    need to be enumerated from the first permutation.
+
+    :param n: The number of elements.
+    :param start: The first rank.
+    :param stop: The rank to stop at.
+    :return: The permutations.
+
+    >>> list(permutations_in_rank_range(3, 1, 4)) == [permutation_from_rank(rank, 3) for rank in range(1, 4)]
+    True
+    """
+
+    def ranked(prefix: Tuple[int, ...], elements: Tuple[int, ...], start: int, stop: int) -> Iterator[Tuple[int, ...]]:
+        count = math.factorial(len(elements))
+        start, stop = max(0, start), min(count, stop)
+        if start >= stop:
+            return
+        if start == 0 and stop == count:
+            yield from map(prefix.__add__, permutations(elements))
+            return
+        block = count // len(elements)
+        for index in range(start // block, -(-stop // block)):
+            offset = index * block
+            yield from ranked(
+                prefix + elements[index : index + 1],
+                elements[:index] + elements[index + 1 :],
+                start - offset,
+                stop - offset,
+            )
+
+    return ranked((), tuple(range(n)), start, stop)
+
+
+def columnar_decode_batch(
+    encoded: Union[bytes, TextBuffer],
+    key_length: int,
+    orders: Iterable[Sequence[int]],
+) -> List[bytes]:
+    """
+    Decode a columnar transposition with many chunk orders at once.
+
+    The text is split into chunks like in `columnar_decode`. Each chunk is written into the decoded text with one
+    strided slice assignment, so decoding costs a few slice operations per chunk instead of a loop per character.
+
+    :param encoded: The encoded text as bytes, e.g. letter codes, or its text buffer.
+    :param key_length: The key length.
+    :param orders: The chunk indices in decoded column order, see `get_decoding_mapping`.
+    :return: The decoded bytes for each order, letter codes for a text buffer.
+
+    >>> columnar_decode_batch(b"HLOOLELWRD", 2, [(0, 1), (1, 0)])
+    [b'HELLOWORLD', b'EHLLWORODL']
+    >>> columnar_decode_batch(b"stis ei hat st", 7, [get_decoding_mapping("somekey")])
+    [b'this is a test']
+    >>> decode_letters(columnar_decode_batch(TextBuffer.from_text("HLOOLELWRD"), 2, [(0, 1)])[0])
+    'HELLOWORLD'
+    """
+    if isinstance(encoded, TextBuffer):
+        encoded = encoded.codes
+    chunk_size, chunk_count = _columnar_layout(len(encoded), key_length)
+    chunks = [encoded[start : start + chunk_size] for start in range(0, len(encoded), chunk_size)]
+    short_chunk = chunk_count - 1
+    short_length = len(chunks[short_chunk])
+    full_length = short_length * chunk_count
+    full_chunks = [chunk[:short_length] for chunk in chunks]
+    short_rows = [chunk[short_length:] for chunk in chunks]
+
+    result = []
+    for order in orders:
+        decoded = bytearray(len(encoded))
+        for column, chunk in enumerate(order):
+            decoded[column:full_length:chunk_count] = full_chunks[chunk]
+        if short_length < chunk_size:
+            column = 0
+            for chunk in order:
+                if chunk != short_chunk:
+                    decoded[full_length + column :: chunk_count - 1] = short_rows[chunk]
+                    column += 1
+        result.append(bytes(decoded))
+    return result
+
+
+def _columnar_brute_force_shard(
+    codes: bytes,
+    key_length: int,
+    start: int,
+    stop: int,
+    scorer: NGramScorer,
+    max_results: int,
+    batch_size: int,
+) -> List[Tuple[float, int, Tuple[int, ...]]]:
+    chunk_count = _columnar_layout(len(codes), key_length)[1]
+    orders = permutations_in_rank_range(chunk_count, start, stop)
+    # Min-heap of the best results, keyed by fitness and negated rank so lower ranks win ties
+    heap: List[Tuple[float, int, Tuple[int, ...]]] = []
+    rank = start
+    while True:
+        batch = list(islice(orders, batch_size))
+        if not batch:
+            return heap
+        for fitness, order in zip(scorer.fitness_batch(columnar_decode_batch(codes, key_length, batch)), batch):
+            entry = (fitness, -rank, order)
+            if len(heap) < max_results:
+                heappush(heap, entry)
+            elif fitness > heap[0][0]:
+                heapreplace(heap, entry)
+            rank += 1
+
+
+def columnar_brute_force(
+    encoded: Union[str, TextBuffer],
+    key_length: int,
+    max_results: int = 10,
+    scorer: Optional[NGramScorer] = None,
+    start: int = 0,
+    stop: Optional[int] = None,
+    batch_size: int = 4096,
+    processes: Optional[int] = None,
+) -> List[Tuple[float, str, str]]:
+    """
+    Decode a columnar transposition with every chunk order and rank the decoded texts.
+
+    The chunk orders are enumerated by permutation rank, and the rank range is split between the worker processes.
+    The orders are decoded in batches with `columnar_decode_batch` and scored with `NGramScorer.fitness_batch`. This
+    is feasible for key lengths up to about 9.
+
+    :param encoded: The encoded text, consisting of letters only, or its text buffer.
+    :param key_length: The key length.
+    :param max_results: The maximum number of results.
+    :param scorer: The scorer ranking the decoded texts, defaults to the English trigram frequencies.
+    :param start: The first permutation rank to try, see `permutation_from_rank`.
+    :param stop: The permutation rank to stop at, defaults to trying all permutations.
+    :param batch_size: The number of orders decoded and scored at once.
+    :param processes: The number of worker processes, defaults to the number of CPUs; if greater than 1, the rank
+                      range is split between them.
+    :return: Tuples of the fitness, the key and the decoded text, best first, see `columnar_key_search`.
+
+    >>> encoded = columnar_encode("WEAREDISCOVEREDFLEEATONCEANDHIDEAWAY", "ZEBRAS")
+    >>> columnar_brute_force(encoded, 6, processes=1)[0][1:]
+    ('FCBDAE', 'WEAREDISCOVEREDFLEEATONCEANDHIDEAWAY')
+    """
+    codes = bytes(letter_codes(encoded))
+    assert len(codes) == len(encoded)
+    scorer = scorer or ngram_scorer_en(3)
+    chunk_count = _columnar_layout(len(codes), key_length)[1]
+    stop = math.factorial(chunk_count) if stop is None else min(stop, math.factorial(chunk_count))
+    processes = processes or os.cpu_count() or 1
+
+    shard_size = max(1, -(-(stop - start) // processes))
+    starts = range(start, stop, shard_size)
+    shard_args = (
+        repeat(codes),
+        repeat(key_length),
+        starts,
+        (min(stop, shard_start + shard_size) for shard_start in starts),
+        repeat(scorer),
+        repeat(max_results),
+        repeat(batch_size),
+    )
+    if processes == 1 or len(starts) <= 1:
+        shards = list(map(_columnar_brute_force_shard, *shard_args))
+    else:
+        with ProcessPoolExecutor(processes) as executor:
+            shards = list(executor.map(_columnar_brute_force_shard, *shard_args))
+
+    best = nlargest(max_results, chain.from_iterable(shards))
+    decoded = columnar_decode_batch(codes, key_length, [order for _, _, order in best])
+    return [
+        (fitness, columnar_key_from_order(order), decode_letters(text))
+        for (fitness, _, order), text in zip(best, decoded)
+    ]
+
+
+def _rank_values(values: Sequence[int]) -> Tuple[int, ...]:
+    """Replace each value by its rank."""
+    ranks = [0] * len(values)
+    for rank, index in enumerate(sorted(range(len(values)), key=values.__getitem__)):
+        ranks[index] = rank
+    return tuple(ranks)
+
+
+def columnar_key_index(words: Iterable[str]) -> Dict[int, Dict[Tuple[int, ...], List[str]]]:
+    """
+    Group keys by their length and decoding mapping.
+
+    :param words: The keys.
+    :return: The keys, grouped by length and decoding mapping.
+
+    >>> columnar_key_index(["ALBERT", "ALCERT", "BOX"])
+    {6: {(0, 3, 1, 2, 4, 5): ['ALBERT', 'ALCERT']}, 3: {(0, 1, 2): ['BOX']}}
+    """
+    result: Dict[int, Dict[Tuple[int, ...], List[str]]] = {}
+    for word in words:
+        result.setdefault(len(word), {}).setdefault(get_decoding_mapping(word), []).append(word)
+    return result
+
+
+@lru_cache(maxsize=None)
+def _dictionary_key_index_en() -> Dict[int, Dict[Tuple[int, ...], List[str]]]:
+    return columnar_key_index(sorted(word for word in nla.dict_std_en if len(word) >= 2))
+
+
+def columnar_dictionary_attack(
+    encoded: Union[str, TextBuffer],
+    words: Optional[Iterable[str]] = None,
+    max_results: int = 10,
+    scorer: Optional[NGramScorer] = None,
+    batch_size: int = 4096,
+) -> List[Tuple[float, List[str], str]]:
+    """
+    Decode a columnar transposition with dictionary words as keys and rank the decoded texts.
+
+    Only the chunk order matters for decoding (see `columnar_decode`), and most keys induce the same order as many
+    others, so the keys are grouped by it and each order is decoded once with `columnar_decode_batch`. The index of
+    the dictionary keys by length and decoding mapping is built once.
+
+    :param encoded: The encoded text, consisting of letters only, or its text buffer.
+    :param words: The keys to try, defaults to `infra.nla.dict_std_en`.
+    :param max_results: The maximum number of results.
+    :param scorer: The scorer ranking the decoded texts, defaults to the English trigram frequencies.
+    :param batch_size: The number of orders decoded and scored at once.
+    :return: Tuples of the fitness, all keys decoding to the text, and the decoded text, best first.
+
+    >>> encoded = columnar_encode("WEAREDISCOVEREDFLEEATONCEANDHIDEAWAY", "ZEBRAS")
+    >>> fitness, keys, text = columnar_dictionary_attack(encoded, ["ALBERT", "ZEBRAS", "ZEBRA", "ZOBRAS", "ZEBU"])[0]
+    >>> keys, text
+    (['ZEBRAS', 'ZOBRAS'], 'WEAREDISCOVEREDFLEEATONCEANDHIDEAWAY')
+    """
+    codes = bytes(letter_codes(encoded))
+    assert len(codes) == len(encoded)
+    scorer = scorer or ngram_scorer_en(3)
+    index = _dictionary_key_index_en() if words is None else columnar_key_index(words)
+
+    # Keys with the same chunk size and chunk order decode the same
+    groups: Dict[Tuple[int, Tuple[int, ...]], Tuple[int, List[str]]] = {}
+    group_key_lengths: Dict[int, List[Tuple[int, Tuple[int, ...]]]] = {}
+    for key_length, mappings in sorted(index.items()):
+        chunk_size, chunk_count = _columnar_layout(len(codes), key_length)
+        for mapping, keys in mappings.items():
+            group = (chunk_size, mapping if chunk_count == key_length else _rank_values(mapping[:chunk_count]))
+            if group not in groups:
+                groups[group] = (key_length, [])
+                group_key_lengths.setdefault(key_length, []).append(group)
+            groups[group][1].extend(keys)
+
+    heap: List[Tuple[float, int, Tuple[int, Tuple[int, ...]]]] = []
+    position = 0
+    for key_length, key_length_groups in group_key_lengths.items():
+        for batch_start in range(0, len(key_length_groups), batch_size):
+            batch = key_length_groups[batch_start : batch_start + batch_size]
+            decoded = columnar_decode_batch(codes, key_length, [order for _, order in batch])
+            for fitness, group in zip(scorer.fitness_batch(decoded), batch):
+                entry = (fitness, -position, group)
+                position += 1
+                if len(heap) < max_results:
+                    heappush(heap, entry)
+                elif fitness > heap[0][0]:
+                    heapreplace(heap, entry)
+
+    result = []
+    for fitness, _, group in nlargest(max_results, heap):
+        key_length, keys = groups[group]
+        result.append((fitness, sorted(keys), decode_letters(columnar_decode_batch(codes, key_length, [group[1]])[0])))
+    return result
@@ -0,0 +1,212 @@
+"""Precompiled binary cache of the language tables in `infra/data`, memory-mapped read-only."""
+
+import csv
+import json
+import math
+import mmap
+import os
+import struct
+from array import array
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+data_dir = Path(__file__).parent / "data"
+default_cache_path = data_dir / "tables.bin"
+
+_magic = b"INFRATBL"
+_version = 2
+_header = struct.Struct("<8sII")
+_alignment = 8
+
+_float_table_sources = {
+    "letter_frq_en": "letter_frq_en.csv",
+    "bigram_frq_en": "bigram_frq_en.csv",
+    "trigram_frq_en": "trigram_frq_en.csv",
+    "cblw_scores_en": "cblw_scores_en.csv",
+}
+_log_probability_sources = {
+    "letter_log_probabilities_en": "letter_frq_en",
+    "bigram_log_probabilities_en": "bigram_frq_en",
+    "trigram_log_probabilities_en": "trigram_frq_en",
+}
+_word_list_source = "word_list_en.csv"
+
+
+def _source_fingerprints(source_dir: Path) -> Dict[str, List[int]]:
+    result = {}
+    for filename in (*_float_table_sources.values(), _word_list_source):
+        stat = (source_dir / filename).stat()
+        result[filename] = [stat.st_size, stat.st_mtime_ns]
+    return result
+
+
+def _parse_float_csv(path: Path) -> array:
+    return array("d", (float(value) for row in csv.reader(path.read_text().splitlines()) for value in row))
+
+
+def log_probabilities(frequencies: Sequence[float], floor: Optional[float] = None) -> Tuple[array, float]:
+    """
+    Convert n-gram frequencies or counts to base-10 log-probabilities.
+
+    :param frequencies: The n-gram frequencies or counts.
+    :param floor: The log-probability of unseen n-grams, defaults to a hundredth of the rarest seen n-gram.
+    :return: The log-probabilities, and the floor used for unseen n-grams.
+
+    >>> table, floor = log_probabilities([1.0, 9.0, 0.0])
+    >>> [round(value, 3) for value in table], round(floor, 3)
+    ([-1.0, -0.046, -3.0], -3.0)
+    """
+    total = sum(frequencies)
+    assert total > 0
+    if floor is None:
+        floor = math.log10(0.01 * min(frq for frq in frequencies if frq > 0) / total)
+    return array("d", (math.log10(frq / total) if frq > 0 else floor for frq in frequencies)), floor
+
+
+def build_cache(path: Union[str, Path] = default_cache_path, source_dir: Path = data_dir) -> Path:
+    """
+    Compile the CSV tables and the word list into a binary cache file.
+
+    The float tables are stored as flat native doubles (the cblw scores row by row), together with the log-probability
+    tables of the n-gram frequencies (see `log_probabilities`), the word list as uppercase, newline-separated UTF-8.
+    The file is written atomically, so running processes keep their mapping of the old file.
+
+    :param path: The cache file to write.
+    :param source_dir: The directory containing the CSV files.
+    :return: The path of the written cache.
+    """
+    path = Path(path)
+    float_tables = {name: _parse_float_csv(source_dir / filename) for name, filename in _float_table_sources.items()}
+    sections: Dict[str, bytes] = {name: table.tobytes() for name, table in float_tables.items()}
+    floors: Dict[str, float] = {}
+    for name, source in _log_probability_sources.items():
+        table, floors[name] = log_probabilities(float_tables[source])
+        sections[name] = table.tobytes()
+    sections["words"] = "\n".join(
+        word.upper() for word in (source_dir / _word_list_source).read_text().splitlines()
+    ).encode("utf-8")
+
+    layout: Dict[str, Tuple[int, int]] = {}
+    offset = 0
+    for name, data in sections.items():
+        layout[name] = (offset, len(data))
+        offset += -(-len(data) // _alignment) * _alignment
+
+    header_fields = {"sections": layout, "floors": floors, "sources": _source_fingerprints(source_dir)}
+    header = json.dumps(header_fields).encode("utf-8")
+    data_start = -(-(_header.size + len(header)) // _alignment) * _alignment
+
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(_header.pack(_magic, _version, len(header)))
+        f.write(header)
+        for name, data in sections.items():
+            f.seek(data_start + layout[name][0])
+            f.write(data)
+        f.truncate(data_start + offset)
+    os.replace(tmp_path, path)
+    return path
+
+
+class TableCache:
+    """Read-only views into a memory-mapped table cache, shared between all processes mapping the same file."""
+
+    def __init__(
+        self,
+        data: mmap.mmap,
+        data_start: int,
+        sections: Dict[str, Tuple[int, int]],
+        floors: Dict[str, float],
+    ):
+        """
+        Wrap a mapped cache file, see `load_cache`.
+
+        :param data: The mapped file.
+        :param data_start: The file offset of the first section.
+        :param sections: The offsets and lengths of the sections, relative to `data_start`.
+        :param floors: The floors of the log-probability tables.
+        """
+        self._data = data
+        self._view = memoryview(data)
+        self._data_start = data_start
+        self._sections = sections
+        self._floors = floors
+
+    def _section(self, name: str) -> memoryview:
+        offset, length = self._sections[name]
+        return self._view[self._data_start + offset : self._data_start + offset + length]
+
+    def float_table(self, name: str) -> Sequence[float]:
+        """
+        Get a float table without copying it.
+
+        :param name: The table name, e.g. `trigram_frq_en`.
+        :return: The flat table.
+        """
+        return self._section(name).cast("d")
+
+    def log_probability_table(self, name: str) -> Tuple[Sequence[float], float]:
+        """
+        Get a log-probability table without copying it.
+
+        :param name: The table name, e.g. `trigram_log_probabilities_en`.
+        :return: The flat table, and the log-probability of unseen n-grams.
+        """
+        return self.float_table(name), self._floors[name]
+
+    def words(self) -> List[str]:
+        """
+        Get the uppercase words of the word list.
+
+        :return: The words.
+        """
+        return str(self._section("words"), "utf-8").split("\n")
+
+
+def load_cache(
+    path: Union[str, Path] = default_cache_path,
+    source_dir: Optional[Path] = data_dir,
+) -> Optional[TableCache]:
+    """
+    Map a cache file written by `build_cache`.
+
+    :param path: The cache file.
+    :param source_dir: The directory containing the CSV files the cache was built from. If given, the cache is
+                       considered stale if any of the files changed since building it.
+    :return: The cache, or None if it is missing, stale or unreadable.
+
+    >>> import tempfile
+    >>> with tempfile.TemporaryDirectory() as tmp:
+    ...     cache = load_cache(build_cache(Path(tmp) / "tables.bin"))
+    ...     len(cache.float_table("trigram_frq_en")), cache.float_table("letter_frq_en")[0], len(cache.words())
+    ...     table, floor = cache.log_probability_table("trigram_log_probabilities_en")
+    ...     (len(table), floor) == (17576, log_probabilities(cache.float_table("trigram_frq_en"))[1])
+    (17576, 0.07586537, 36525)
+    True
+    >>> load_cache("does-not-exist.bin") is None
+    True
+    """
+    try:
+        with open(path, "rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    try:
+        magic, version, header_size = _header.unpack_from(data)
+        if magic != _magic or version != _version:
+            raise ValueError("unsupported cache format")
+        header = json.loads(data[_header.size : _header.size + header_size])
+        if source_dir is not None and header["sources"] != _source_fingerprints(source_dir):
+            raise ValueError("stale cache")
+    except (OSError, ValueError, KeyError, struct.error):
+        data.close()
+        return None
+
+    data_start = -(-(_header.size + header_size) // _alignment) * _alignment
+    sections = {name: tuple(section) for name, section in header["sections"].items()}
+    return TableCache(data, data_start, sections, header["floors"])
+
+
+if __name__ == "__main__":
+    print(f"Wrote {build_cache()}")
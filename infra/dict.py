@@ -1,7 +1,9 @@
 """Functions related to scanning and modifying dicts."""
 
-from typing import Dict, List, Tuple, TypeVar, Union
+from itertools import zip_longest
+from typing import Dict, Generic, Iterable, List, Optional, Set, Tuple, TypeVar, Union
 
+from infra.grid import Grid
 from infra.string import all_string_indices
 from infra.utils import Rotatable, rotate_left
 
@@ -9,6 +11,77 @@ TKey = TypeVar("TKey")
 TValue = TypeVar("TValue")
 
 
+class CharIndex(Generic[TKey]):
+    """
+    An inverted index of the chars of a dictionary of strings, mapping each char to its coordinates.
+
+    The index is built with one scan of the dictionary, after which a char is looked up without scanning the values.
+    The functions modifying dictionaries in this module take an optional index and update it with the changed chars
+    only. The keys of the dictionary must not be added, removed or reordered while it is indexed.
+
+    >>> data = {"A": "BC", "D": "CB"}
+    >>> index = CharIndex(data)
+    >>> index.find_char("C") == find_char(data, "C")
+    True
+    >>> swap_columns(data, 0, 1, index)
+    >>> index.find_string_chars("CX")
+    [('C', [('A', 1), ('D', 2)]), ('X', [])]
+    """
+
+    def __init__(self, data: Dict[TKey, Rotatable]):
+        """
+        Index the chars of a dictionary.
+
+        :param data: The dictionary to index.
+        """
+        self._keys = list(data.keys())
+        self._rows = {key: row for row, key in enumerate(self._keys)}
+        # The coordinates are held as row and 0-based column, so they sort in the order of `find_char`
+        self._coordinates: Dict[str, Set[Tuple[int, int]]] = {}
+        for row, value in enumerate(data.values()):
+            for column, char in enumerate(value):
+                self._coordinates.setdefault(char, set()).add((row, column))
+
+    def find_char(self, char: str) -> Tuple[Tuple[TKey, int], ...]:
+        """
+        Find all coordinates of a char, like `find_char`.
+
+        :param char: The char to search for.
+        :return: Tuples of the dictionary key and the 1-based index of the char in the corresponding value.
+        """
+        assert len(char) == 1
+        keys = self._keys
+        return tuple((keys[row], column + 1) for row, column in sorted(self._coordinates.get(char, ())))
+
+    def find_string_chars(self, string: str) -> List[Tuple[str, List[Tuple[TKey, int]]]]:
+        """
+        Find all coordinates of the given string chars, like `find_string_chars`.
+
+        :param string: The string containing the chars to search for.
+        :return: A list of tuples, each tuple containing the char and the corresponding list of coordinates.
+        """
+        found = {char: self.find_char(char) for char in set(string)}
+        return [(char, list(found[char])) for char in string]
+
+    def update(self, key: TKey, old: Rotatable, new: Rotatable):
+        """
+        Update the index after a dictionary value was replaced.
+
+        :param key: The key of the replaced value.
+        :param old: The old value.
+        :param new: The new value.
+        """
+        row = self._rows[key]
+        coordinates = self._coordinates
+        for column, (old_char, new_char) in enumerate(zip_longest(old, new)):
+            if old_char == new_char:
+                continue
+            if old_char is not None:
+                coordinates[old_char].discard((row, column))
+            if new_char is not None:
+                coordinates.setdefault(new_char, set()).add((row, column))
+
+
 def find_char(data: Dict[TKey, str], char: str) -> Tuple[Tuple[TKey, int]]:
     """
     Find all indices of a given char in a dictionary of strings.
@@ -39,35 +112,68 @@ def find_string_chars(data: Dict[TKey, str], string: str) -> List[Tuple[str, Lis
     return [(char, list(find_char(data, char))) for char in string]
 
 
-def swap_values(data: Dict[TKey, TValue], a: TKey, b: TKey):
+def swap_values(data: Dict[TKey, TValue], a: TKey, b: TKey, index: Optional[CharIndex[TKey]] = None):
     """
     Swap the values in a dictionary.
 
     :param data: The dictionary to modify.
     :param a: The first key to swap.
     :param b: The second key to swap.
+    :param index: The index of the dictionary to update.
 
     >>> data = {"A": "B", "C": "D"}
     >>> swap_values(data, "A", "C")
     >>> data
     {'A': 'D', 'C': 'B'}
     """
+    if index is not None:
+        index.update(a, data[a], data[b])
+        index.update(b, data[b], data[a])
     data[a], data[b] = data[b], data[a]
 
 
-def rotate_column(data: Dict[TKey, Rotatable], column: int, n: int):
+def _is_grid(rows: Iterable[Rotatable]) -> bool:
+    """Check whether rows can be handled by a `Grid`, i.e. they are non-empty strings of the same length."""
+    lengths = {len(row) if isinstance(row, str) else -1 for row in rows}
+    return len(lengths) == 1 and next(iter(lengths)) > 0
+
+
+def _update_rows(data: Union[Dict[TKey, Rotatable], List[Rotatable]], grid: Grid, index: Optional[CharIndex]):
+    """Write the changed rows of a grid created from a dictionary or list back to it."""
+    for key, row in zip(grid.keys, grid.rows()):
+        if row != data[key]:
+            if index is not None:
+                index.update(key, data[key], row)
+            data[key] = row
+
+
+def rotate_column(data: Dict[TKey, Rotatable], column: int, n: int, index: Optional[CharIndex[TKey]] = None):
     """
     Rotate a column in a dictionary.
 
+    Rectangular dictionaries of strings are rotated with a `Grid`; other dictionaries, e.g. with rows of different
+    lengths, are rotated value by value.
+
     :param data: The dictionary.
     :param column: The column to rotate.
     :param n: The amount of rotation.
+    :param index: The index of the dictionary to update.
 
     >>> data = {1: "A", 2: "B", 3: "C"}
     >>> rotate_column(data, 0, 1)
     >>> data
     {1: 'C', 2: 'A', 3: 'B'}
+    >>> data = {1: "AX", 2: "B", 3: "CYZ"}
+    >>> rotate_column(data, 0, 1)
+    >>> data
+    {1: 'CX', 2: 'A', 3: 'BYZ'}
     """
+    if _is_grid(data.values()):
+        grid = Grid.from_dict(data)
+        grid.rotate_column(column, n)
+        _update_rows(data, grid, index)
+        return
+
     keys = list(data.keys())
     for _ in range(n):
         prev = data[keys[-1]][column]
@@ -75,42 +181,67 @@ def rotate_column(data: Dict[TKey, Rotatable], column: int, n: int):
             s = data[key]
             current = s[column]
             data[key] = s[:column] + prev + s[column + 1 :]
+            if index is not None:
+                index.update(key, s, data[key])
             prev = current
 
 
-def rotate_value_left(data: Dict[TKey, Rotatable], key: TKey, n: int):
+def rotate_value_left(data: Dict[TKey, Rotatable], key: TKey, n: int, index: Optional[CharIndex[TKey]] = None):
     """
     Rotate a value in a dictionary.
 
     :param data: The dictionary to modify.
     :param key: The key to rotate the value of.
     :param n: The amount of rotation
+    :param index: The index of the dictionary to update.
 
     >>> data = {"A": "BCDE"}
     >>> rotate_value_left(data, "A", 1)
     >>> data
     {'A': 'CDEB'}
     """
-    data[key] = rotate_left(data[key], n)
-
-
-def swap_columns(data: Union[Dict[TKey, Rotatable], List[Rotatable]], a: int, b: int):
+    value = data[key]
+    data[key] = rotate_left(value, n)
+    if index is not None:
+        index.update(key, value, data[key])
+
+
+def swap_columns(
+    data: Union[Dict[TKey, Rotatable], List[Rotatable]],
+    a: int,
+    b: int,
+    index: Optional[CharIndex] = None,
+):
     """
     Swap two columns of a dictionary.
 
     :param data: The dictionary to modify.
     :param a: The first column.
     :param b: The second column.
+    :param index: The index of the dictionary, or of the list as a dictionary by list index, to update.
 
     >>> data = {"A": "BC", "D": "EF"}
     >>> swap_columns(data, 0, 1)
     >>> data
     {'A': 'CB', 'D': 'FE'}
+    >>> data = {"A": "ABC", "B": "DE"}
+    >>> swap_columns(data, 0, 1)
+    >>> data
+    {'A': 'BAC', 'B': 'ED'}
     """
+    rows = data.values() if isinstance(data, dict) else data
+    if _is_grid(rows):
+        grid = Grid.from_dict(data) if isinstance(data, dict) else Grid.from_rows(data)
+        grid.swap_columns(a, b)
+        _update_rows(data, grid, index)
+        return
+
     for key, values in data.items() if isinstance(data, dict) else enumerate(data):
         ac = values[a]
         bc = values[b]
         s = values
         s = s[:a] + bc + s[a + 1 :]
         s = s[:b] + ac + s[b + 1 :]
+        if index is not None:
+            index.update(key, values, s)
         data[key] = s
@@ -0,0 +1,237 @@
+"""A mutable grid of chars with lazy row and column rotations."""
+
+from typing import Dict, Generic, Hashable, List, Optional, Sequence, TypeVar
+
+TKey = TypeVar("TKey", bound=Hashable)
+
+
+class Grid(Generic[TKey]):
+    """
+    A rectangular grid of chars with named rows, stored row by row in one flat list.
+
+    Rotating a row or a column only changes its rotation offset. Offsets are kept along one axis at a time: rotating
+    or swapping along the other axis first applies the pending offsets to the cells, so runs of row rotations and runs
+    of column rotations each cost constant time per rotation. Swaps exchange whole slices of the cells in place.
+
+    >>> grid = Grid.from_dict({"A": "ABC", "B": "DEF", "C": "GHI"})
+    >>> grid.rotate_column(0, 1)
+    >>> grid.rotate_row_left(0, 1)
+    >>> grid.swap_columns(1, 2)
+    >>> grid.to_dict()
+    {'A': 'BGC', 'B': 'AFE', 'C': 'DIH'}
+    >>> grid.column(0)
+    'BAD'
+    """
+
+    __slots__ = ("keys", "height", "width", "_cells", "_row_offsets", "_column_offsets", "_axis")
+
+    def __init__(self, keys: Sequence[TKey], rows: Sequence[str]):
+        """
+        Create a grid.
+
+        :param keys: The names of the rows.
+        :param rows: The rows, all of the same length.
+        :raises ValueError: If there are no rows, or the rows are empty or differ in length.
+
+        >>> Grid.from_rows(["AB", "C"])
+        Traceback (most recent call last):
+        ...
+        ValueError: the rows must be non-empty and of the same length
+        """
+        if len(keys) != len(rows):
+            raise ValueError("there must be one key per row")
+        if not rows or not rows[0] or any(len(row) != len(rows[0]) for row in rows):
+            raise ValueError("the rows must be non-empty and of the same length")
+        self.keys = list(keys)
+        self.height = len(rows)
+        self.width = len(rows[0])
+        self._cells = list("".join(rows))
+        self._row_offsets = [0] * self.height
+        self._column_offsets = [0] * self.width
+        # The axis with pending offsets: None, "row" or "column"
+        self._axis: Optional[str] = None
+
+    @classmethod
+    def from_dict(cls, data: Dict[TKey, str]) -> "Grid[TKey]":
+        """
+        Create a grid from a dictionary of rows.
+
+        :param data: The rows by name.
+        :return: The grid.
+        """
+        return cls(list(data.keys()), list(data.values()))
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[str]) -> "Grid[int]":
+        """
+        Create a grid from a list of rows, named by their index.
+
+        :param rows: The rows.
+        :return: The grid.
+        """
+        return Grid(range(len(rows)), rows)
+
+    def copy(self) -> "Grid[TKey]":
+        """
+        Copy the grid, including the pending offsets.
+
+        :return: The copy.
+        """
+        result: Grid[TKey] = Grid.__new__(Grid)
+        result.keys = self.keys
+        result.height = self.height
+        result.width = self.width
+        result._cells = self._cells[:]
+        result._row_offsets = self._row_offsets[:]
+        result._column_offsets = self._column_offsets[:]
+        result._axis = self._axis
+        return result
+
+    def _index(self, row: int, column: int) -> int:
+        """Get the index of a cell in `_cells`."""
+        if self._axis == "row":
+            return row * self.width + (column + self._row_offsets[row]) % self.width
+        if self._axis == "column":
+            return (row - self._column_offsets[column]) % self.height * self.width + column
+        return row * self.width + column
+
+    def _flush(self):
+        """Apply the pending offsets to the cells."""
+        cells = self._cells
+        width = self.width
+        if self._axis == "row":
+            for row, offset in enumerate(self._row_offsets):
+                if offset:
+                    start = row * width
+                    cells[start : start + width] = cells[start + offset : start + width] + cells[start : start + offset]
+            self._row_offsets = [0] * self.height
+        elif self._axis == "column":
+            for column, offset in enumerate(self._column_offsets):
+                if offset:
+                    column_cells = cells[column::width]
+                    cells[column::width] = column_cells[-offset:] + column_cells[:-offset]
+            self._column_offsets = [0] * width
+        self._axis = None
+
+    def __getitem__(self, coordinates: Sequence[int]) -> str:  # noqa D105
+        row, column = coordinates
+        return self._cells[self._index(row, column)]
+
+    def row(self, row: int) -> str:
+        """
+        Get a row.
+
+        :param row: The row index.
+        :return: The chars of the row.
+        """
+        cells = self._cells
+        start = row * self.width
+        if self._axis == "row":
+            offset = self._row_offsets[row]
+            return "".join(cells[start + offset : start + self.width] + cells[start : start + offset])
+        if self._axis == "column":
+            return "".join(cells[self._index(row, column)] for column in range(self.width))
+        return "".join(cells[start : start + self.width])
+
+    def column(self, column: int) -> str:
+        """
+        Get a column.
+
+        :param column: The column index.
+        :return: The chars of the column, from top to bottom.
+        """
+        return "".join(self._cells[self._index(row, column)] for row in range(self.height))
+
+    def rows(self) -> List[str]:
+        """
+        Get all rows.
+
+        :return: The rows, from top to bottom.
+        """
+        self._flush()
+        cells = self._cells
+        width = self.width
+        return ["".join(cells[start : start + width]) for start in range(0, len(cells), width)]
+
+    def columns(self) -> List[str]:
+        """
+        Get all columns.
+
+        :return: The columns, from left to right.
+        """
+        return [self.column(column) for column in range(self.width)]
+
+    def to_dict(self) -> Dict[TKey, str]:
+        """
+        Convert the grid to a dictionary of rows.
+
+        :return: The rows by name.
+        """
+        return dict(zip(self.keys, self.rows()))
+
+    def text(self) -> str:
+        """
+        Get the contents of the grid, e.g. to compare or hash grids.
+
+        :return: The rows, concatenated.
+        """
+        return "".join(self.rows())
+
+    def rotate_row_left(self, row: int, n: int):
+        """
+        Rotate a row to the left, like `infra.dict.rotate_value_left`.
+
+        :param row: The row index.
+        :param n: The amount of rotation.
+        """
+        if self._axis == "column":
+            self._flush()
+        self._axis = "row"
+        self._row_offsets[row] = (self._row_offsets[row] + n) % self.width
+
+    def rotate_column(self, column: int, n: int):
+        """
+        Rotate a column downwards, like `infra.dict.rotate_column`.
+
+        :param column: The column index.
+        :param n: The amount of rotation.
+        """
+        if self._axis == "row":
+            self._flush()
+        self._axis = "column"
+        self._column_offsets[column] = (self._column_offsets[column] + n) % self.height
+
+    def swap_rows(self, a: int, b: int):
+        """
+        Swap two rows, like `infra.dict.swap_values`.
+
+        :param a: The first row index.
+        :param b: The second row index.
+        """
+        if self._axis == "column":
+            self._flush()
+        cells = self._cells
+        width = self.width
+        a_start = a * width
+        b_start = b * width
+        cells[a_start : a_start + width], cells[b_start : b_start + width] = (
+            cells[b_start : b_start + width],
+            cells[a_start : a_start + width],
+        )
+        offsets = self._row_offsets
+        offsets[a], offsets[b] = offsets[b], offsets[a]
+
+    def swap_columns(self, a: int, b: int):
+        """
+        Swap two columns, like `infra.dict.swap_columns`.
+
+        :param a: The first column index.
+        :param b: The second column index.
+        """
+        if self._axis == "row":
+            self._flush()
+        cells = self._cells
+        width = self.width
+        cells[a::width], cells[b::width] = cells[b::width], cells[a::width]
+        offsets = self._column_offsets
+        offsets[a], offsets[b] = offsets[b], offsets[a]
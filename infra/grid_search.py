@@ -0,0 +1,293 @@
+"""Search for sequences of grid operations making a grid of chars readable."""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from enum import Enum, auto
+from heapq import heappush, heapreplace, nlargest
+from itertools import repeat
+from typing import (
+    Callable,
+    Dict,
+    FrozenSet,
+    Generic,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from infra.grid import Grid, TKey
+from infra.word_search import WordCoverage, dictionary_automaton_en
+
+
+class GridOperation(Enum):
+    """An operation modifying a grid, see the corresponding `Grid` methods."""
+
+    RotateColumn = auto()
+    """Rotate column `a` downwards by `b`."""
+
+    RotateRowLeft = auto()
+    """Rotate row `a` to the left by `b`."""
+
+    SwapColumns = auto()
+    """Swap the columns `a` and `b`."""
+
+    SwapRows = auto()
+    """Swap the rows `a` and `b`."""
+
+
+GridMove = Tuple[GridOperation, int, int]
+GridFitness = Callable[[Grid], float]
+
+
+def grid_moves(height: int, width: int, operations: Iterable[GridOperation] = tuple(GridOperation)) -> List[GridMove]:
+    """
+    Get all moves changing a grid of a given size, without moves equivalent to each other.
+
+    :param height: The number of rows.
+    :param width: The number of columns.
+    :param operations: The operations to use.
+    :return: The moves.
+
+    >>> len(grid_moves(2, 3)), grid_moves(2, 3, [GridOperation.SwapRows])
+    (11, [(<GridOperation.SwapRows: 4>, 0, 1)])
+    """
+    result: List[GridMove] = []
+    for operation in operations:
+        if operation == GridOperation.RotateColumn:
+            result.extend((operation, column, n) for column in range(width) for n in range(1, height))
+        elif operation == GridOperation.RotateRowLeft:
+            result.extend((operation, row, n) for row in range(height) for n in range(1, width))
+        elif operation == GridOperation.SwapColumns:
+            result.extend((operation, a, b) for a in range(width) for b in range(a + 1, width))
+        elif operation == GridOperation.SwapRows:
+            result.extend((operation, a, b) for a in range(height) for b in range(a + 1, height))
+        else:
+            raise ValueError
+    return result
+
+
+def apply_move(grid: Grid, move: GridMove):
+    """
+    Apply a move to a grid.
+
+    :param grid: The grid to modify.
+    :param move: The move.
+    """
+    operation, a, b = move
+    if operation == GridOperation.RotateColumn:
+        grid.rotate_column(a, b)
+    elif operation == GridOperation.RotateRowLeft:
+        grid.rotate_row_left(a, b)
+    elif operation == GridOperation.SwapColumns:
+        grid.swap_columns(a, b)
+    elif operation == GridOperation.SwapRows:
+        grid.swap_rows(a, b)
+    else:
+        raise ValueError
+
+
+def apply_moves(data: Dict[TKey, str], moves: Iterable[GridMove]) -> Dict[TKey, str]:
+    """
+    Apply moves to a dictionary of rows.
+
+    :param data: The rows by name.
+    :param moves: The moves.
+    :return: The modified rows by name.
+
+    >>> apply_moves({"A": "AB", "B": "CD"}, [(GridOperation.RotateColumn, 0, 1), (GridOperation.SwapColumns, 0, 1)])
+    {'A': 'BC', 'B': 'DA'}
+    """
+    grid = Grid.from_dict(data)
+    for move in moves:
+        apply_move(grid, move)
+    return grid.to_dict()
+
+
+def grid_word_fitness_en(
+    grid: Grid,
+    min_word_length: int = 3,
+    max_word_length: int = 12,
+    coverage: WordCoverage = WordCoverage.Greedy,
+) -> float:
+    """
+    Calculate the share of the cells covered by dictionary words along the rows and columns of a grid.
+
+    :param grid: The grid.
+    :param min_word_length: The minimum word length to consider.
+    :param max_word_length: The maximum word length to consider.
+    :param coverage: How to count the characters covered by words.
+    :return: The fitness, between 0 and 1; each cell is counted once along its row and once along its column.
+
+    >>> grid_word_fitness_en(Grid.from_dict({"A": "CAT", "B": "XXX"}))
+    0.25
+    """
+    automaton = dictionary_automaton_en(min_word_length, max_word_length)
+    covered = sum(automaton.covered_chars_batch(grid.rows() + grid.columns(), coverage))
+    return covered / (2 * grid.height * grid.width)
+
+
+def _expand_states(
+    keys: Sequence,
+    states: Sequence[Tuple[str, Tuple[GridMove, ...]]],
+    moves: Sequence[GridMove],
+    fitness_fn: GridFitness,
+    seen: FrozenSet[str],
+    beam_width: int,
+    max_states: Optional[int],
+    deadline: Optional[float],
+) -> Tuple[List[Tuple[float, int, str, Tuple[GridMove, ...]]], int, bool]:
+    """
+    Apply each move to each state and keep the best distinct children not seen before.
+
+    :return: The best children as tuples of the fitness, the negated child number, the grid contents and the moves,
+             the number of scored children, and whether all children were scored within the budgets.
+    """
+    width = len(states[0][0]) // len(keys)
+    heap: List[Tuple[float, int, str, Tuple[GridMove, ...]]] = []
+    visited = set(seen)
+    count = 0
+    for text, path in states:
+        parent = Grid(keys, [text[start : start + width] for start in range(0, len(text), width)])
+        for move in moves:
+            if (max_states is not None and count >= max_states) or (
+                deadline is not None and count % 64 == 0 and time.time() > deadline
+            ):
+                return heap, count, False
+            child = parent.copy()
+            apply_move(child, move)
+            child_text = child.text()
+            if child_text in visited:
+                continue
+            visited.add(child_text)
+            entry = (fitness_fn(child), -count, child_text, path + (move,))
+            count += 1
+            if len(heap) < beam_width:
+                heappush(heap, entry)
+            elif entry[0] > heap[0][0]:
+                heapreplace(heap, entry)
+    return heap, count, True
+
+
+@dataclass
+class GridSearchResults(Generic[TKey]):
+    """The results of `grid_beam_search`."""
+
+    results: List[Tuple[float, Tuple[GridMove, ...], Dict[TKey, str]]]
+    """Tuples of the fitness, the moves and the resulting rows by name, best first, one per distinct grid."""
+
+    states: int
+    """The number of scored grids."""
+
+    depth: int
+    """The number of completely expanded levels."""
+
+    elapsed: float
+    """The wall-clock time in seconds."""
+
+
+def grid_beam_search(
+    data: Dict[TKey, str],
+    fitness_fn: GridFitness = grid_word_fitness_en,
+    operations: Iterable[GridOperation] = tuple(GridOperation),
+    beam_width: int = 20,
+    max_depth: int = 3,
+    max_results: int = 10,
+    max_states: Optional[int] = None,
+    time_budget: Optional[float] = None,
+    processes: Optional[int] = None,
+) -> GridSearchResults[TKey]:
+    """
+    Search for the sequences of grid operations leading to the fittest grids with a beam search.
+
+    Each level applies every move of `grid_moves` to each grid of the beam, and the `beam_width` fittest children
+    become the next beam. Grids are deduplicated by their contents, so grids reached before, e.g. by undoing the last
+    move, are not scored again.
+
+    :param data: The rows by name, all of the same length.
+    :param fitness_fn: The fitness function scoring the grids, higher being better; it must be picklable to run in
+                       several processes.
+    :param operations: The operations to use.
+    :param beam_width: The number of grids expanded per level.
+    :param max_depth: The maximum number of moves.
+    :param max_results: The maximum number of results.
+    :param max_states: The number of scored grids after which the search stops.
+    :param time_budget: The wall-clock time in seconds after which the search stops.
+    :param processes: The number of worker processes, defaults to the number of CPUs; if greater than 1, the beam of
+                      each level is split between them.
+    :return: The best grids found and the search statistics.
+
+    >>> data = {"A": "ATQC", "B": "GQDO"}
+    >>> search = grid_beam_search(data, max_depth=2, max_results=1, processes=1)
+    >>> search.results[0][2], search.depth
+    ({'A': 'QCAT', 'B': 'QDOG'}, 2)
+    """
+    started = time.time()
+    deadline = None if time_budget is None else started + time_budget
+    processes = processes or os.cpu_count() or 1
+    grid = Grid.from_dict(data)
+    keys = grid.keys
+    moves = grid_moves(grid.height, grid.width, operations)
+
+    text = grid.text()
+    best = {text: (fitness_fn(grid), ())}
+    beam = [(text, ())]
+    seen = {text}
+    states = 1
+    depth = 0
+
+    executor = ProcessPoolExecutor(processes) if processes > 1 else None
+    try:
+        while depth < max_depth and beam:
+            remaining = None if max_states is None else max_states - states
+            if (remaining is not None and remaining <= 0) or (deadline is not None and time.time() > deadline):
+                break
+            shards = [beam[i::processes] for i in range(min(processes, len(beam)))]
+            shard_args = (
+                repeat(keys),
+                shards,
+                repeat(moves),
+                repeat(fitness_fn),
+                repeat(frozenset(seen)),
+                repeat(beam_width),
+                repeat(remaining if remaining is None else -(-remaining // len(shards))),
+                repeat(deadline),
+            )
+            if executor is None:
+                expanded = list(map(_expand_states, *shard_args))
+            else:
+                expanded = list(executor.map(_expand_states, *shard_args))
+
+            children: Dict[str, Tuple[float, Tuple[GridMove, ...]]] = {}
+            complete = True
+            for heap, count, shard_complete in expanded:
+                states += count
+                complete = complete and shard_complete
+                for fitness, _, child_text, path in sorted(heap, reverse=True):
+                    children.setdefault(child_text, (fitness, path))
+            beam = [
+                (child_text, path)
+                for child_text, (_, path) in nlargest(beam_width, children.items(), key=lambda item: item[1][0])
+            ]
+            seen.update(children)
+            best.update(children)
+            if not complete:
+                break
+            depth += 1
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    width = grid.width
+    return GridSearchResults(
+        [
+            (fitness, path, dict(zip(keys, (text[start : start + width] for start in range(0, len(text), width)))))
+            for text, (fitness, path) in nlargest(max_results, best.items(), key=lambda item: item[1][0])
+        ],
+        states,
+        depth,
+        time.time() - started,
+    )
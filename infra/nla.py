@@ -1,11 +1,27 @@
 """Natural language analysis functions."""
 import csv
+from functools import cached_property, lru_cache, reduce
+from itertools import repeat
+from operator import add, mul
 from pathlib import Path
-from typing import Dict, FrozenSet, Iterable, Set, Tuple
-
+from typing import (
+    Any,
+    Dict,
+    FrozenSet,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
+
+from infra.data_cache import TableCache, load_cache, log_probabilities
+from infra.text import TextBuffer, alphabet_en, alphabet_fi  # noqa: F401
 from infra.utils import get_pairs, split_every
 
-alphabet_fi = "ABCDEFGHIJKLMNOPQRSTUVWXYZÅÄÖ"
+TextOrBuffer = Union[str, TextBuffer]
 
 
 def _load_frq_csv(path: Path) -> Dict[str, float]:
@@ -31,18 +47,6 @@ def _load_float_list(filename: str) -> Iterable[float]:
     yield from map(float, (Path(__file__).parent / "data" / filename).read_text().splitlines())
 
 
-dict_std_en = _load_dict("word_list_en.csv")
-letter_frq_en = {chr(ord("A") + i): value for i, value in enumerate(_load_float_list("letter_frq_en.csv"))}
-bigram_frq_en = {
-    chr(ord("A") + (i // 26)) + chr(ord("A") + (i % 26)): value
-    for i, value in enumerate(_load_float_list("bigram_frq_en.csv"))
-}
-trigram_frq_en = {
-    chr(ord("A") + (i // 26 // 26)) + chr(ord("A") + (i // 26 % 26)) + chr(ord("A") + (i % 26)): value
-    for i, value in enumerate(_load_float_list("trigram_frq_en.csv"))
-}
-
-
 def get_quantile(data: Dict[str, float], quantile: float) -> Set[str]:
     """
     Get the top quantile of a data set.
@@ -65,13 +69,154 @@ def get_quantile(data: Dict[str, float], quantile: float) -> Set[str]:
     return result
 
 
-cblw_scores_en = _load_cblw_score_csv(Path(__file__).parent / "data" / "cblw_scores_en.csv")
-top_letters_en = get_quantile(letter_frq_en, 0.75)
-top_bigrams_en = get_quantile(bigram_frq_en, 0.75)
-top_trigrams_en = get_quantile(trigram_frq_en, 0.75)
+class _Tables:
+    """The language tables, loaded on first access from the binary cache, or from the CSV files as a fallback."""
+
+    def __init__(self):
+        self._float_tables: Dict[str, Sequence[float]] = {}
+        self._log_probability_tables: Dict[str, Tuple[Sequence[float], float]] = {}
+
+    @cached_property
+    def cache(self) -> Optional[TableCache]:
+        return load_cache()
+
+    def float_table(self, name: str) -> Sequence[float]:
+        table = self._float_tables.get(name)
+        if table is None:
+            if self.cache is not None:
+                table = self.cache.float_table(name)
+            elif name == "cblw_scores_en":
+                table = tuple(_load_cblw_score_csv(Path(__file__).parent / "data" / "cblw_scores_en.csv").values())
+            else:
+                table = tuple(_load_float_list(f"{name}.csv"))
+            self._float_tables[name] = table
+        return table
+
+    def log_probability_table(self, name: str) -> Tuple[Sequence[float], float]:
+        result = self._log_probability_tables.get(name)
+        if result is None:
+            if self.cache is not None:
+                result = self.cache.log_probability_table(name)
+            else:
+                result = log_probabilities(self.float_table(name.replace("log_probabilities", "frq")))
+            self._log_probability_tables[name] = result
+        return result
+
+    @cached_property
+    def dict_std_en(self) -> FrozenSet[str]:
+        if self.cache is not None:
+            return frozenset(self.cache.words())
+        return _load_dict("word_list_en.csv")
+
+    @cached_property
+    def letter_frq_en(self) -> Dict[str, float]:
+        return {chr(ord("A") + i): value for i, value in enumerate(self.float_table("letter_frq_en"))}
+
+    @cached_property
+    def bigram_frq_en(self) -> Dict[str, float]:
+        return {
+            chr(ord("A") + (i // 26)) + chr(ord("A") + (i % 26)): value
+            for i, value in enumerate(self.float_table("bigram_frq_en"))
+        }
+
+    @cached_property
+    def trigram_frq_en(self) -> Dict[str, float]:
+        return {
+            chr(ord("A") + (i // 26 // 26)) + chr(ord("A") + (i // 26 % 26)) + chr(ord("A") + (i % 26)): value
+            for i, value in enumerate(self.float_table("trigram_frq_en"))
+        }
+
+    @cached_property
+    def cblw_scores_en(self) -> Dict[str, float]:
+        return {
+            chr(ord("A") + (i // 26)) + chr(ord("A") + (i % 26)): value
+            for i, value in enumerate(self.float_table("cblw_scores_en"))
+        }
+
+    @cached_property
+    def top_letters_en(self) -> Set[str]:
+        return get_quantile(self.letter_frq_en, 0.75)
+
+    @cached_property
+    def top_bigrams_en(self) -> Set[str]:
+        return get_quantile(self.bigram_frq_en, 0.75)
+
+    @cached_property
+    def top_trigrams_en(self) -> Set[str]:
+        return get_quantile(self.trigram_frq_en, 0.75)
+
+
+_tables = _Tables()
+
+
+def __getattr__(name: str) -> Any:
+    """
+    Load the language tables (`dict_std_en`, `letter_frq_en`, `cblw_scores_en`, ...) on first access.
+
+    :param name: The attribute name.
+    :return: The table.
+    """
+    if not name.endswith("_en") or not isinstance(getattr(_Tables, name, None), cached_property):
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(_tables, name)
+    globals()[name] = value
+    return value
+
+
+def ngram_frq_en(n: int) -> Dict[str, float]:
+    """
+    Get the English n-gram frequency table for a given n-gram length.
+
+    :param n: The n-gram length, 1 to 3.
+    :return: `letter_frq_en`, `bigram_frq_en` or `trigram_frq_en`.
+
+    >>> len(ngram_frq_en(2))
+    676
+    """
+    return getattr(_tables, ("letter_frq_en", "bigram_frq_en", "trigram_frq_en")[n - 1])
+
+
+def ngram_frq_table_en(n: int) -> Sequence[float]:
+    """
+    Get the English n-gram frequencies as a flat table indexed by n-gram code (see `infra.stats.ngram_codes`).
+
+    The table is a read-only view into the memory-mapped binary cache if it is available (see `infra.data_cache`),
+    so its pages are shared between processes. Otherwise the CSV file is parsed once per process. The dict tables
+    such as `trigram_frq_en`, as well as `dict_std_en` and the cblw score lookups, are always private copies built
+    in each process.
+
+    :param n: The n-gram length, 1 to 3.
+    :return: The frequencies.
+
+    >>> ngram_frq_table_en(2)[1] == ngram_frq_en(2)["AB"], ngram_frq_table_en(3) is ngram_frq_table_en(3)
+    (True, True)
+    """
+    return _tables.float_table(("letter_frq_en", "bigram_frq_en", "trigram_frq_en")[n - 1])
+
+
+def ngram_log_probability_table_en(n: int) -> Tuple[Sequence[float], float]:
+    """
+    Get the base-10 log-probabilities of the English n-grams as a flat table indexed by n-gram code.
+
+    Like `ngram_frq_table_en`, the table is a read-only view into the memory-mapped binary cache if it is available,
+    so its pages are shared between processes. Otherwise it is computed from the frequencies once per process, see
+    `infra.data_cache.log_probabilities`.
 
+    :param n: The n-gram length, 1 to 3.
+    :return: The log-probabilities, and the log-probability of unseen n-grams.
 
-def get_mfl_score_en(string: str) -> float:
+    >>> table, floor = ngram_log_probability_table_en(2)
+    >>> expected_table, expected_floor = log_probabilities(ngram_frq_table_en(2))
+    >>> list(table) == list(expected_table), floor == expected_floor
+    (True, True)
+    """
+    return _tables.log_probability_table(
+        ("letter_log_probabilities_en", "bigram_log_probabilities_en", "trigram_log_probabilities_en")[n - 1],
+    )
+
+
+def get_mfl_score_en(string: TextOrBuffer) -> float:
     """
     https://www.staff.uni-mainz.de/pommeren/Cryptology/Classic/3_Coincid/MFL.html.
 
@@ -81,11 +226,13 @@ def get_mfl_score_en(string: str) -> float:
     0.7272727272727273
     >>> get_mfl_score_en("uibyl jhboli")
     0.5
+    >>> get_mfl_score_en(TextBuffer.from_text("hello world"))
+    0.8
     """
-    return sum(1 for c in string if c.upper() in top_letters_en) / len(string)
+    return sum(map(_top_letter_flags().__getitem__, _cblw_codes(string))) / len(string)
 
 
-def get_mfl_bigram_score_en(string: str) -> float:
+def get_mfl_bigram_score_en(string: TextOrBuffer) -> float:
     """
     https://www.staff.uni-mainz.de/pommeren/Cryptology/Classic/3_Coincid/MFL.html.
 
@@ -99,10 +246,12 @@ def get_mfl_bigram_score_en(string: str) -> float:
     if len(string) <= 1:
         return 0.0
 
-    return sum(1 for c1, c2 in zip(string, string[1:]) if f"{c1}{c2}".upper() in top_bigrams_en) / (len(string) - 1)
+    codes = _cblw_codes(string)
+    bigrams = map(add, map(mul, codes, repeat(27)), codes[1:])
+    return sum(map(_top_bigram_flags().__getitem__, bigrams)) / (len(string) - 1)
 
 
-def get_cblw_score(s1: str, s2: str) -> float:
+def get_cblw_score(s1: TextOrBuffer, s2: TextOrBuffer) -> float:
     """
     Get the conditional bigram log-weight score of two strings.
 
@@ -116,14 +265,84 @@ def get_cblw_score(s1: str, s2: str) -> float:
     1.3599999999999999
     >>> get_cblw_score("HLOOL", "ELWRD")
     2.1000000000000005
+    >>> get_cblw_score(TextBuffer.from_text("HLOOL"), TextBuffer.from_text("ELWRD"))
+    2.1000000000000005
     """
-    score = 0.0
-    for c1, c2 in zip(s1, s2):
-        score += cblw_scores_en.get(f"{c1}{c2}".upper(), 0.0)
-    return score / min(len(s1), len(s2))
+    lookup = _cblw_table().__getitem__
+    return reduce(add, map(lookup, map(add, _cblw_row_offsets(s1), _cblw_codes(s2))), 0.0) / min(len(s1), len(s2))
+
+
+_cblw_unknown_code = 26
+
+
+@lru_cache(maxsize=None)
+def _cblw_table() -> Sequence[float]:
+    """Get the cblw scores as a flat 27×27 table, the last row and column being zero for non-letters."""
+    scores = _tables.float_table("cblw_scores_en")
+    table = [0.0] * 27 * 27
+    for i, score in enumerate(scores):
+        table[i // 26 * 27 + i % 26] = score
+    return table
+
+
+@lru_cache(maxsize=None)
+def _cblw_char_code(c: str) -> int:
+    upper = c.upper()
+    return ord(upper) - ord("A") if len(upper) == 1 and "A" <= upper <= "Z" else _cblw_unknown_code
+
+
+def _cblw_codes(s: TextOrBuffer) -> Sequence[int]:
+    """Get the English letter codes of a string, all other characters being coded as `_cblw_unknown_code`."""
+    if isinstance(s, TextBuffer):
+        return s.recode(alphabet_en, _cblw_unknown_code).codes
+    return list(map(_cblw_char_code, s))
+
+
+@lru_cache(maxsize=None)
+def _top_letter_flags() -> Sequence[int]:
+    """Get 1 for each code of `_cblw_codes` which is a top English letter, 0 otherwise."""
+    return [int(c in _tables.top_letters_en) for c in alphabet_en] + [0]
 
 
-def find_best_shifted_cblw_score(a: str, b: str, max_shift: int = 20) -> Tuple[int, float]:
+@lru_cache(maxsize=None)
+def _top_bigram_flags() -> Sequence[int]:
+    """Get 1 for each pair of `_cblw_codes`, row-major with 27 columns, which is a top English bigram, 0 otherwise."""
+    letters = alphabet_en + "_"
+    return [int(f"{c1}{c2}" in _tables.top_bigrams_en) for c1 in letters for c2 in letters]
+
+
+def _cblw_row_offsets(s: TextOrBuffer) -> List[int]:
+    return list(map(mul, _cblw_codes(s), repeat(27)))
+
+
+def _best_shifted_cblw_score(a_rows: Sequence[int], b: Sequence[int], max_shift: int) -> Tuple[int, float]:
+    """
+    Like `find_best_shifted_cblw_score`, for strings encoded by `_cblw_row_offsets` and `_cblw_codes`.
+
+    The scores are summed in the same order as `get_cblw_score` does, so the results are identical.
+    """
+    lookup = _cblw_table().__getitem__
+    a_length = len(a_rows)
+    b_length = len(b)
+    max_shift = min(max_shift, max(a_length, b_length))
+    best_shift = None
+    best_score = -1.0
+
+    for shift in range(max_shift + 1):
+        score = reduce(add, map(lookup, map(add, a_rows[shift:], b)), 0.0) / min(a_length, b_length + shift)
+        if score > best_score:
+            best_shift = shift
+            best_score = score
+        score = reduce(add, map(lookup, map(add, a_rows, b[shift:])), 0.0) / min(a_length + shift, b_length)
+        if score > best_score:
+            best_shift = -shift
+            best_score = score
+
+    assert best_shift is not None
+    return best_shift, best_score
+
+
+def find_best_shifted_cblw_score(a: TextOrBuffer, b: TextOrBuffer, max_shift: int = 20) -> Tuple[int, float]:
     """
     Find the combination of two strings with the best cblw score when shifting the strings.
 
@@ -139,22 +358,29 @@ def find_best_shifted_cblw_score(a: str, b: str, max_shift: int = 20) -> Tuple[i
     >>> find_best_shifted_cblw_score("xxHLOOL", "ELWRD")
     (2, 1.5000000000000002)
     """
-    max_shift = min(max_shift, max(len(a), len(b)))
-    best_shift = None
-    best_score = -1.0
+    return _best_shifted_cblw_score(_cblw_row_offsets(a), _cblw_codes(b), max_shift)
 
-    for shift in range(max_shift + 1):
-        score = get_cblw_score(a, " " * shift + b)
-        if score > best_score:
-            best_shift = shift
-            best_score = score
-        score = get_cblw_score(" " * shift + a, b)
-        if score > best_score:
-            best_shift = -shift
-            best_score = score
 
-    assert best_shift is not None
-    return best_shift, best_score
+def calc_cblw_matrix(columns: Sequence[TextOrBuffer]) -> List[List[float]]:
+    """
+    Calculate the cblw scores of all ordered pairs of strings, without shifting.
+
+    :param columns: The strings.
+    :return: The score matrix, `matrix[a][b]` being `get_cblw_score(columns[a], columns[b])` and the diagonal being 0.
+
+    >>> calc_cblw_matrix(["HLOOL", "ELWRD"])
+    [[0.0, 2.1000000000000005], [1.6800000000000002, 0.0]]
+    """
+    lookup = _cblw_table().__getitem__
+    row_offsets = [_cblw_row_offsets(column) for column in columns]
+    codes = [_cblw_codes(column) for column in columns]
+    return [
+        [
+            reduce(add, map(lookup, map(add, a_rows, b_codes)), 0.0) / min(len(a_rows), len(b_codes)) if a != b else 0.0
+            for b, b_codes in enumerate(codes)
+        ]
+        for a, a_rows in enumerate(row_offsets)
+    ]
 
 
 def calc_cblw_scores(
@@ -190,14 +416,17 @@ def calc_cblw_scores(
     HLOOLELW
     RD
     """
+    codes = _cblw_codes(plaintext)
+    row_offsets = _cblw_row_offsets(plaintext)
     for split_size in range(min_split_size, len(plaintext) // 2 + 4):
-        splits = split_every(plaintext, split_size)
+        split_codes = split_every(codes, split_size)
+        split_row_offsets = split_every(row_offsets, split_size)
 
         best_shift = -1
         best_score = -1.0
         best_pair = (-1, -1)
-        for p1, p2 in get_pairs(len(splits)):
-            shift, score = find_best_shifted_cblw_score(splits[p1], splits[p2], max_shift)
+        for p1, p2 in get_pairs(len(split_codes)):
+            shift, score = _best_shifted_cblw_score(split_row_offsets[p1], split_codes[p2], max_shift)
             if score > best_score:
                 best_shift = shift
                 best_score = score
@@ -0,0 +1,151 @@
+"""Repeated substring analysis based on suffix arrays."""
+
+import math
+from collections import Counter
+from functools import reduce
+from operator import sub
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+
+def suffix_array(text: str) -> List[int]:
+    """
+    Sort the suffixes of a text by prefix doubling.
+
+    :param text: The text.
+    :return: The start indices of the suffixes in lexicographic order.
+
+    >>> suffix_array("BANANA")
+    [5, 3, 1, 0, 4, 2]
+    """
+    n = len(text)
+    ranks = [ord(c) for c in text]
+    result = list(range(n))
+    length = 1
+    while n > 1:
+        # Sort by the ranks of the first `length` characters, then by the ranks of the following `length` characters
+        base = max(ranks) + 2
+        keys = [rank * base for rank in ranks]
+        for i in range(n - length):
+            keys[i] += ranks[i + length] + 1
+        result.sort(key=keys.__getitem__)
+
+        ranks = [0] * n
+        for previous, current in zip(result, result[1:]):
+            ranks[current] = ranks[previous] + (keys[previous] != keys[current])
+        if ranks[result[-1]] == n - 1:
+            break
+        length *= 2
+    return result
+
+
+def lcp_array(text: str, suffixes: Sequence[int]) -> List[int]:
+    """
+    Calculate the longest common prefix lengths of adjacent suffixes (Kasai's algorithm).
+
+    :param text: The text.
+    :param suffixes: The suffix array of the text.
+    :return: The length of the common prefix of each suffix and the preceding one, 0 for the first one.
+
+    >>> lcp_array("BANANA", suffix_array("BANANA"))
+    [0, 1, 3, 0, 0, 2]
+    """
+    n = len(text)
+    rank = [0] * n
+    for i, suffix in enumerate(suffixes):
+        rank[suffix] = i
+
+    result = [0] * n
+    common = 0
+    for suffix in range(n):
+        if rank[suffix] == 0:
+            common = 0
+            continue
+        previous = suffixes[rank[suffix] - 1]
+        while suffix + common < n and previous + common < n and text[suffix + common] == text[previous + common]:
+            common += 1
+        result[rank[suffix]] = common
+        if common:
+            common -= 1
+    return result
+
+
+def repeat_groups(
+    text: str,
+    min_length: int = 2,
+    max_length: Optional[int] = None,
+) -> Iterator[Tuple[int, int, Tuple[int, ...]]]:
+    """
+    Find the groups of repeated substrings sharing the same positions.
+
+    Each group is an interval of the suffix array whose suffixes share a common prefix. All prefixes of that common
+    prefix which are longer than the common prefix of the enclosing interval occur at exactly the same positions. The
+    groups are generated while traversing the suffix array, without collecting them.
+
+    :param text: The text.
+    :param min_length: The minimum substring length.
+    :param max_length: The maximum substring length.
+    :return: Tuples of the shortest and longest substring length and the sorted start indices of the substrings.
+
+    >>> sorted(repeat_groups("BANANA", 1))
+    [(1, 1, (1, 3, 5)), (1, 2, (2, 4)), (2, 3, (1, 3))]
+    """
+    suffixes = suffix_array(text)
+    lcp = lcp_array(text, suffixes)
+
+    # Stack of (common prefix length, first suffix array index) of the open intervals
+    stack = [(0, 0)]
+    for i in range(1, len(text) + 1):
+        common = lcp[i] if i < len(text) else 0
+        left = i - 1
+        while common < stack[-1][0]:
+            length, left = stack.pop()
+            parent_length = max(common, stack[-1][0])
+            shortest = max(parent_length + 1, min_length)
+            longest = length if max_length is None else min(length, max_length)
+            if shortest <= longest:
+                yield shortest, longest, tuple(sorted(suffixes[left:i]))
+        if common > stack[-1][0]:
+            stack.append((common, left))
+
+
+def repeats(
+    text: str,
+    min_length: int = 2,
+    max_length: Optional[int] = None,
+) -> Iterator[Tuple[str, Tuple[int, ...]]]:
+    """
+    Find every substring occurring more than once, see `repeat_groups`.
+
+    :param text: The text.
+    :param min_length: The minimum substring length.
+    :param max_length: The maximum substring length.
+    :return: Tuples of the substring and its sorted start indices, in no particular order.
+
+    >>> sorted(repeats("HELLLLHEHE"))
+    [('HE', (0, 6, 8)), ('LL', (2, 3, 4)), ('LLL', (2, 3))]
+    """
+    for shortest, longest, positions in repeat_groups(text, min_length, max_length):
+        start = positions[0]
+        for length in range(shortest, longest + 1):
+            yield text[start : start + length], positions
+
+
+def spacing_gcd_histogram(text: str, min_length: int = 3, max_length: Optional[int] = None) -> Dict[int, int]:
+    """
+    Count the greatest common divisors of the spacings between repeated substrings (Kasiski examination).
+
+    Each group of `repeat_groups` is counted once, so a long repeat does not count once per contained substring. For
+    polyalphabetic ciphers, the key length tends to divide the most frequent GCDs.
+
+    :param text: The text.
+    :param min_length: The minimum substring length.
+    :param max_length: The maximum substring length.
+    :return: The number of repeat groups per GCD, most frequent first.
+
+    >>> spacing_gcd_histogram("ABCXYZABCQQQABC")
+    {6: 1}
+    """
+    histogram: Counter = Counter()
+    for _, _, positions in repeat_groups(text, min_length, max_length):
+        histogram[reduce(math.gcd, map(sub, positions[1:], positions))] += 1
+    return dict(histogram.most_common())
@@ -0,0 +1,168 @@
+"""Log-probability n-gram scoring."""
+
+from array import array
+from collections import Counter
+from functools import lru_cache
+from typing import Iterable, Optional, Sequence, Union
+
+from infra import nla
+from infra.data_cache import log_probabilities
+from infra.stats import encode_letters, letter_codes, ngram_codes
+from infra.text import TextBuffer
+
+TextOrCodes = Union[str, TextBuffer, Sequence[int]]
+
+
+class NGramScorer:
+    """
+    Score texts by the log-probabilities of their n-grams.
+
+    The log-probabilities are stored in a flat table indexed by n-gram code (see `infra.stats.ngram_codes`), so a text
+    is scored in a single pass over its letter codes. Higher scores are better.
+
+    >>> scorer = ngram_scorer_en(3)
+    >>> scorer.fitness("THEQUICKBROWNFOX") > scorer.fitness("XOFNWORBKCIUQEHT")
+    True
+    >>> tuple(scorer.fitness_batch(["THE", "QQQ"])) == (scorer.fitness("THE"), scorer.floor)
+    True
+    """
+
+    __slots__ = ("n", "log_probabilities", "floor", "ceiling")
+
+    def __init__(self, n: int, log_probabilities: Sequence[float], floor: float):
+        """
+        Create a scorer from a log-probability table.
+
+        :param n: The n-gram length.
+        :param log_probabilities: The base-10 log-probabilities, 26**n cells indexed by n-gram code.
+        :param floor: The log-probability used for n-grams that were never seen.
+        """
+        assert n >= 1 and len(log_probabilities) == 26**n
+        self.n = n
+        self.log_probabilities = log_probabilities
+        self.floor = floor
+        self.ceiling = max(log_probabilities)
+
+    @classmethod
+    def from_frequencies(cls, n: int, frequencies: Sequence[float], floor: Optional[float] = None) -> "NGramScorer":
+        """
+        Create a scorer from n-gram frequencies or counts.
+
+        :param n: The n-gram length.
+        :param frequencies: The n-gram frequencies or counts, 26**n cells indexed by n-gram code.
+        :param floor: The log-probability of unseen n-grams, defaults to a hundredth of the rarest seen n-gram.
+        :return: The scorer.
+        """
+        return cls(n, *log_probabilities(frequencies, floor))
+
+    @classmethod
+    def from_corpus(cls, chunks: Iterable[str], n: int = 4, floor: Optional[float] = None) -> "NGramScorer":
+        """
+        Create a scorer by counting the n-grams of a corpus.
+
+        :param chunks: The corpus text, possibly split into chunks. N-grams spanning chunks are counted.
+        :param n: The n-gram length.
+        :param floor: The log-probability of unseen n-grams, see `from_frequencies`.
+        :return: The scorer.
+        """
+        counts = array("d", [0.0]) * 26**n
+        tail = b""
+        for chunk in chunks:
+            codes = tail + encode_letters(chunk)
+            for code, count in Counter(ngram_codes(codes, n)).items():
+                counts[code] += count
+            tail = codes[len(codes) - n + 1 :] if n > 1 else b""
+        return cls.from_frequencies(n, counts, floor)
+
+    def score(self, text: TextOrCodes) -> float:
+        """
+        Calculate the summed log-probabilities of all n-grams of a text.
+
+        :param text: The text or its letter codes.
+        :return: The score.
+        """
+        return sum(map(self.log_probabilities.__getitem__, ngram_codes(letter_codes(text), self.n)))
+
+    def fitness(self, text: TextOrCodes) -> float:
+        """
+        Calculate the mean log-probability per n-gram of a text.
+
+        This can be used as a `fitness_fn`.
+
+        :param text: The text or its letter codes.
+        :return: The fitness, or the floor if the text is shorter than an n-gram.
+        """
+        codes = letter_codes(text)
+        ngram_count = len(codes) - self.n + 1
+        if ngram_count <= 0:
+            return self.floor
+        return self.score(codes) / ngram_count
+
+    def bounded_fitness(self, text: TextOrCodes, bound: float, block_size: int = 64) -> Optional[float]:
+        """
+        Calculate the fitness of a text, abandoning early if it cannot exceed a bound.
+
+        After each block of n-grams, the remaining n-grams are assumed to have the highest log-probability of the table
+        (`ceiling`); if the fitness still would not exceed the bound, scoring stops. This can be used as a bounded
+        fitness function, see `infra.ciphers.transposition.find_best_paths`.
+
+        :param text: The text or its letter codes.
+        :param bound: The fitness the text needs to exceed.
+        :param block_size: The number of n-grams to score between checks.
+        :return: The fitness, or None if it is known not to exceed the bound.
+
+        >>> scorer = ngram_scorer_en(3)
+        >>> scorer.bounded_fitness("XQJZVKXQJZVK" * 20, -3.0) is None
+        True
+        >>> scorer.bounded_fitness("THEQUICKBROWNFOX", -5.0) == scorer.fitness("THEQUICKBROWNFOX")
+        True
+        """
+        codes = list(ngram_codes(letter_codes(text), self.n))
+        ngram_count = len(codes)
+        if ngram_count <= 0:
+            return self.floor if self.floor > bound else None
+        required = bound * ngram_count
+        score = 0.0
+        for start in range(0, ngram_count, block_size):
+            score += sum(map(self.log_probabilities.__getitem__, codes[start : start + block_size]))
+            remaining = ngram_count - start - block_size
+            if remaining > 0 and score + remaining * self.ceiling <= required:
+                return None
+        return score / ngram_count
+
+    def error(self, text: TextOrCodes) -> float:
+        """
+        Calculate the negated fitness of a text, lower being better.
+
+        This can be used as an error function.
+
+        :param text: The text or its letter codes.
+        :return: The error.
+        """
+        return -self.fitness(text)
+
+    def fitness_batch(self, texts: Iterable[TextOrCodes]) -> Sequence[float]:
+        """
+        Calculate the fitness of many texts.
+
+        :param texts: The texts or their letter codes.
+        :return: The fitness of each text.
+        """
+        return array("d", map(self.fitness, texts))
+
+
+@lru_cache(maxsize=None)
+def ngram_scorer_en(n: int = 3) -> NGramScorer:
+    """
+    Get a scorer built from the English n-gram frequency tables.
+
+    The log-probabilities are read from the memory-mapped binary cache without copying if it is available, see
+    `infra.nla.ngram_log_probability_table_en`.
+
+    :param n: The n-gram length, 1 to 3.
+    :return: The scorer.
+
+    >>> ngram_scorer_en(2).floor == NGramScorer.from_frequencies(2, nla.ngram_frq_table_en(2)).floor
+    True
+    """
+    return NGramScorer(n, *nla.ngram_log_probability_table_en(n))
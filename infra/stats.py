@@ -1,12 +1,37 @@
 """N-gram stats and other stats."""
 
 import math
+import mmap
+import os
+from array import array
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
-from typing import Dict, Iterable
-
-from infra.nla import bigram_frq_en, letter_frq_en, trigram_frq_en
+from functools import lru_cache
+from itertools import compress, cycle, islice, repeat
+from operator import add, mul, sub, truediv
+from pathlib import Path
+from typing import (
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+from infra import nla
+from infra.text import TextBuffer, alphabet_en
 
 NGramFrequencies = Dict[str, float]
+NGramCounts = Sequence[int]
+
+_letter_code_table = bytes.maketrans(bytes(range(ord("A"), ord("Z") + 1)), bytes(range(26)))
+_letter_code_decode_table = bytes.maketrans(bytes(range(26)), bytes(range(ord("A"), ord("Z") + 1)))
+_non_letter_bytes = bytes(c for c in range(256) if not (ord("A") <= c <= ord("Z")))
 
 
 @dataclass
@@ -69,21 +94,25 @@ def _entropy(single_letter_frq: NGramFrequencies) -> float:
     return -sum(freq * math.log(freq) for freq in single_letter_frq.values() if freq > 0)
 
 
-def calc_stats(text: str) -> Stats:
+def calc_stats(text: Union[str, TextBuffer]) -> Stats:
     """
     Calculate several stats about a given text.
 
-    :param text: The text to calculate the stats on.
+    :param text: The text to calculate the stats on, or its text buffer.
     :return: The stats.
+
+    >>> calc_stats(TextBuffer.from_text("Hello, World!")) == calc_stats("HELLOWORLD")
+    True
     """
+    text = str(text)
     single_letters = count_ngram_frq(text)
-    monogram_error = _ngram_error(single_letters, letter_frq_en)
+    monogram_error = _ngram_error(single_letters, nla.letter_frq_en)
 
     bigrams = count_ngram_frq(map("".join, zip(text, text[1:])))
-    bigram_error = _ngram_error(bigrams, bigram_frq_en)
+    bigram_error = _ngram_error(bigrams, nla.bigram_frq_en)
 
     trigrams = count_ngram_frq(map("".join, zip(text, text[1:], text[2:])))
-    trigram_error = _ngram_error(trigrams, trigram_frq_en)
+    trigram_error = _ngram_error(trigrams, nla.trigram_frq_en)
 
     return Stats(
         letter_count=len(text),
@@ -115,9 +144,9 @@ def transform_stats_with_substitution_key(stats: Stats, key: Dict[str, str]) ->
     bigrams = {substitute(i): it for i, it in stats.bigrams.items()}
     trigrams = {substitute(i): it for i, it in stats.trigrams.items()}
 
-    single_letter_error = _ngram_error(single_letters, letter_frq_en)
-    bigram_error = _ngram_error(bigrams, bigram_frq_en)
-    trigram_error = _ngram_error(trigrams, trigram_frq_en)
+    single_letter_error = _ngram_error(single_letters, nla.letter_frq_en)
+    bigram_error = _ngram_error(bigrams, nla.bigram_frq_en)
+    trigram_error = _ngram_error(trigrams, nla.trigram_frq_en)
     return Stats(
         letter_count=stats.letter_count,
         monogram=single_letters,
@@ -130,3 +159,628 @@ def transform_stats_with_substitution_key(stats: Stats, key: Dict[str, str]) ->
         ic=stats.ic,
         entropy=stats.entropy,
     )
+
+
+def encode_letters(text: str) -> bytes:
+    """
+    Encode the letters of a text as letter codes, A being 0 and Z being 25.
+
+    The text is converted to uppercase first, all characters outside A-Z are dropped.
+
+    :param text: The text to encode.
+    :return: The letter codes.
+
+    >>> list(encode_letters("Hello, World!"))
+    [7, 4, 11, 11, 14, 22, 14, 17, 11, 3]
+    """
+    return _encode_ascii_letters(text.upper().encode("ascii", "ignore"))
+
+
+def _encode_ascii_letters(data: bytes) -> bytes:
+    return data.upper().translate(_letter_code_table, _non_letter_bytes)
+
+
+def letter_codes(text: Union[str, TextBuffer, Sequence[int]]) -> Sequence[int]:
+    """
+    Get the letter codes of a text, passing through texts which already are letter codes.
+
+    Text buffers of the English alphabet are passed through without copying, letters outside A-Z are dropped from
+    other text buffers.
+
+    :param text: The text, a text buffer, or its letter codes.
+    :return: The letter codes.
+
+    >>> list(letter_codes("AbC")), list(letter_codes(bytes([0, 1]))), list(letter_codes(TextBuffer.from_text("AbC")))
+    ([0, 1, 2], [0, 1], [0, 1, 2])
+    """
+    if isinstance(text, str):
+        return encode_letters(text)
+    if isinstance(text, TextBuffer):
+        return text.recode(alphabet_en).codes
+    return text
+
+
+def decode_letters(codes: Iterable[int]) -> str:
+    """
+    Decode letter codes to an uppercase string.
+
+    :param codes: The letter codes.
+    :return: The decoded text.
+
+    >>> decode_letters(encode_letters("Hello, World!"))
+    'HELLOWORLD'
+    """
+    return bytes(codes).translate(_letter_code_decode_table).decode("ascii")
+
+
+def ngram_codes(codes: Sequence[int], n: int) -> Iterator[int]:
+    """
+    Combine letter codes to n-gram codes.
+
+    The code of an n-gram is the base-26 number of its letter codes, the first letter being the most significant one.
+
+    :param codes: The letter codes.
+    :param n: The n-gram length.
+    :return: The n-gram codes.
+
+    >>> list(ngram_codes(encode_letters("ABCD"), 2))
+    [1, 28, 55]
+    """
+    assert n >= 1
+    result = iter(codes)
+    for offset in range(1, n):
+        result = map(add, map(mul, result, repeat(26)), codes[offset:])
+    return result
+
+
+def _ngram_name(code: int, n: int) -> str:
+    return "".join(chr(ord("A") + (code // 26**exponent) % 26) for exponent in reversed(range(n)))
+
+
+@lru_cache(maxsize=None)
+def _reference_frequencies(n: int) -> Sequence[float]:
+    return nla.ngram_frq_table_en(n)
+
+
+def _sparse_ngram_error(counts: Mapping[int, int], reference: Sequence[float]) -> float:
+    total = sum(counts.values())
+    differences = map(sub, map(reference.__getitem__, counts.keys()), map(truediv, counts.values(), repeat(total)))
+    return sum(map(pow, differences, repeat(2)))
+
+
+def _dense_counts(counts: Mapping[int, int], n: int) -> NGramCounts:
+    dense = array("I", [0]) * 26**n
+    for code, count in counts.items():
+        dense[code] = count
+    return dense
+
+
+def _nonzero_counts(counts: NGramCounts) -> Dict[int, int]:
+    return {code: counts[code] for code in compress(range(len(counts)), counts)}
+
+
+def _sparse_counts(counts: Mapping[int, int]) -> Tuple[array, array]:
+    """Convert sparse counts to parallel arrays of the n-gram codes, in ascending order, and their counts."""
+    codes = sorted(counts)
+    return array("H", codes), array("Q", map(counts.__getitem__, codes))
+
+
+class ArrayStats:
+    """
+    Text statistics backed by sparse n-gram count arrays.
+
+    Only the n-grams occurring in the text are stored, as parallel arrays of their codes (see `ngram_codes`) in
+    ascending order and their counts, so the size of an instance grows with the text instead of with the 26³ possible
+    trigrams. The n-gram frequency dicts of `Stats` are only built when they are accessed, so instances can be used
+    wherever `Stats` is expected.
+
+    >>> stats = calc_array_stats("ABAB")
+    >>> list(stats.bigram_codes), list(stats.bigram_counts)
+    ([1, 26], [2, 1])
+    """
+
+    __slots__ = (
+        "letter_count",
+        "monogram_codes",
+        "monogram_counts",
+        "bigram_codes",
+        "bigram_counts",
+        "trigram_codes",
+        "trigram_counts",
+        "monogram_error",
+        "bigram_error",
+        "trigram_error",
+        "total_error",
+        "ic",
+        "entropy",
+    )
+
+    def __init__(
+        self,
+        monogram_counts: Mapping[int, int],
+        bigram_counts: Mapping[int, int],
+        trigram_counts: Mapping[int, int],
+    ):
+        """
+        Calculate the stats from sparse n-gram counts.
+
+        :param monogram_counts: The non-zero monogram counts, keyed by n-gram code.
+        :param bigram_counts: The non-zero bigram counts, keyed by n-gram code.
+        :param trigram_counts: The non-zero trigram counts, keyed by n-gram code.
+        """
+        self.monogram_codes, self.monogram_counts = _sparse_counts(monogram_counts)
+        self.bigram_codes, self.bigram_counts = _sparse_counts(bigram_counts)
+        self.trigram_codes, self.trigram_counts = _sparse_counts(trigram_counts)
+
+        self.letter_count = sum(monogram_counts.values())
+        self.monogram_error = _sparse_ngram_error(monogram_counts, _reference_frequencies(1))
+        self.bigram_error = _sparse_ngram_error(bigram_counts, _reference_frequencies(2))
+        self.trigram_error = _sparse_ngram_error(trigram_counts, _reference_frequencies(3))
+        self.total_error = _total_ngram_error(self.monogram_error, self.bigram_error, self.trigram_error)
+        self.ic = _array_coincidence_index(self.monogram_counts)
+        self.entropy = _array_entropy(self.monogram_counts)
+
+    @classmethod
+    def from_dense_counts(
+        cls,
+        monogram_counts: NGramCounts,
+        bigram_counts: NGramCounts,
+        trigram_counts: NGramCounts,
+    ) -> "ArrayStats":
+        """
+        Calculate the stats from dense n-gram counts.
+
+        :param monogram_counts: The monogram counts, 26 cells.
+        :param bigram_counts: The bigram counts, 26² cells.
+        :param trigram_counts: The trigram counts, 26³ cells.
+        :return: The stats.
+        """
+        assert len(monogram_counts) == 26 and len(bigram_counts) == 26**2 and len(trigram_counts) == 26**3
+        return cls(_nonzero_counts(monogram_counts), _nonzero_counts(bigram_counts), _nonzero_counts(trigram_counts))
+
+    @property
+    def monogram(self) -> NGramFrequencies:  # noqa D102
+        return _counts_to_frequencies(self.monogram_codes, self.monogram_counts, 1)
+
+    @property
+    def bigrams(self) -> NGramFrequencies:  # noqa D102
+        return _counts_to_frequencies(self.bigram_codes, self.bigram_counts, 2)
+
+    @property
+    def trigrams(self) -> NGramFrequencies:  # noqa D102
+        return _counts_to_frequencies(self.trigram_codes, self.trigram_counts, 3)
+
+    @property
+    def efficiency(self) -> float:  # noqa D102
+        return self.entropy / math.log(26.0)
+
+    @property
+    def redundancy(self) -> float:  # noqa D102
+        return 1.0 - self.efficiency
+
+    def to_stats(self) -> Stats:
+        """
+        Convert to a `Stats` object.
+
+        :return: The stats, including the n-gram frequency dicts.
+        """
+        return Stats(
+            letter_count=self.letter_count,
+            monogram=self.monogram,
+            monogram_error=self.monogram_error,
+            bigrams=self.bigrams,
+            bigram_error=self.bigram_error,
+            trigrams=self.trigrams,
+            trigram_error=self.trigram_error,
+            total_error=self.total_error,
+            ic=self.ic,
+            entropy=self.entropy,
+        )
+
+
+def _counts_to_frequencies(codes: Sequence[int], counts: Sequence[int], n: int) -> NGramFrequencies:
+    total = sum(counts)
+    return {_ngram_name(code, n): count / total for code, count in zip(codes, counts)}
+
+
+def _array_coincidence_index(monogram_counts: NGramCounts) -> float:
+    letter_count = sum(monogram_counts)
+    if letter_count < 2:
+        return 0.0
+    return sum(count * (count - 1) for count in monogram_counts) / (letter_count * (letter_count - 1))
+
+
+def _array_entropy(monogram_counts: NGramCounts) -> float:
+    letter_count = sum(monogram_counts)
+    return -sum(frq * math.log(frq) for frq in (count / letter_count for count in monogram_counts if count > 0))
+
+
+def count_ngram_codes(codes: Sequence[int], n: int) -> NGramCounts:
+    """
+    Count the n-grams of a sequence of letter codes.
+
+    :param codes: The letter codes.
+    :param n: The n-gram length.
+    :return: The dense counts, indexed by n-gram code.
+
+    >>> counts = count_ngram_codes(encode_letters("ABAB"), 2)
+    >>> len(counts), counts[1], counts[26]
+    (676, 2, 1)
+    """
+    return _dense_counts(Counter(ngram_codes(codes, n)), n)
+
+
+def calc_array_stats(text: Union[str, TextBuffer]) -> ArrayStats:
+    """
+    Calculate several stats about a given text, using dense n-gram count arrays.
+
+    Characters outside A-Z are ignored, lowercase letters are counted as uppercase. For texts only consisting of
+    uppercase letters, the results are the same as the ones of `calc_stats`.
+
+    :param text: The text to calculate the stats on, or its text buffer.
+    :return: The stats.
+
+    >>> stats = calc_array_stats("HELLOWORLD")
+    >>> reference = calc_stats("HELLOWORLD")
+    >>> stats.letter_count, stats.monogram == reference.monogram, stats.trigrams == reference.trigrams
+    (10, True, True)
+    >>> round(stats.total_error, 12) == round(reference.total_error, 12), round(stats.ic, 12) == round(reference.ic, 12)
+    (True, True)
+    """
+    codes = letter_codes(text)
+    return ArrayStats(Counter(codes), Counter(ngram_codes(codes, 2)), Counter(ngram_codes(codes, 3)))
+
+
+@dataclass
+class BatchStats:
+    """Text statistics of a batch of texts, holding one value per text in each field."""
+
+    letter_count: Sequence[int]
+    monogram_error: Sequence[float]
+    bigram_error: Sequence[float]
+    trigram_error: Sequence[float]
+    total_error: Sequence[float]
+    ic: Sequence[float]
+    entropy: Sequence[float]
+
+    def __len__(self) -> int:  # noqa D105
+        return len(self.letter_count)
+
+
+def _sparse_coincidence_index(monogram_counts: Mapping[int, int], letter_count: int) -> float:
+    if letter_count < 2:
+        return 0.0
+    counts = monogram_counts.values()
+    return sum(map(mul, counts, map(sub, counts, repeat(1)))) / (letter_count * (letter_count - 1))
+
+
+def _sparse_entropy(monogram_counts: Mapping[int, int], letter_count: int) -> float:
+    frequencies = tuple(map(truediv, monogram_counts.values(), repeat(letter_count)))
+    return -sum(map(mul, frequencies, map(math.log, frequencies)))
+
+
+def calc_stats_batch(texts: Iterable[Union[str, TextBuffer, Sequence[int]]]) -> BatchStats:
+    """
+    Calculate the stats of many texts in one call.
+
+    The texts are handled like in `calc_array_stats`. Instead of strings, rows of letter codes (see `encode_letters`)
+    may be passed, e.g. the rows of a 2-D array of candidate texts.
+
+    :param texts: The texts to calculate the stats on.
+    :return: The stats, each field holding one value per text.
+
+    >>> batch = calc_stats_batch(["HELLOWORLD", encode_letters("DLROWOLLEH")])
+    >>> len(batch), tuple(batch.letter_count)
+    (2, (10, 10))
+    >>> round(batch.total_error[0], 12) == round(calc_stats("HELLOWORLD").total_error, 12)
+    True
+    >>> batch.ic[0] == batch.ic[1], batch.total_error[0] == batch.total_error[1]
+    (True, False)
+    """
+    letter_count = array("L")
+    monogram_error = array("d")
+    bigram_error = array("d")
+    trigram_error = array("d")
+    total_error = array("d")
+    ic = array("d")
+    entropy = array("d")
+
+    monogram_reference = _reference_frequencies(1)
+    bigram_reference = _reference_frequencies(2)
+    trigram_reference = _reference_frequencies(3)
+
+    for text in texts:
+        codes = letter_codes(text)
+        monograms = Counter(codes)
+        count = len(codes)
+        errors = (
+            _sparse_ngram_error(monograms, monogram_reference),
+            _sparse_ngram_error(Counter(ngram_codes(codes, 2)), bigram_reference),
+            _sparse_ngram_error(Counter(ngram_codes(codes, 3)), trigram_reference),
+        )
+
+        letter_count.append(count)
+        monogram_error.append(errors[0])
+        bigram_error.append(errors[1])
+        trigram_error.append(errors[2])
+        total_error.append(_total_ngram_error(*errors))
+        ic.append(_sparse_coincidence_index(monograms, count))
+        entropy.append(_sparse_entropy(monograms, count))
+
+    return BatchStats(
+        letter_count=letter_count,
+        monogram_error=monogram_error,
+        bigram_error=bigram_error,
+        trigram_error=trigram_error,
+        total_error=total_error,
+        ic=ic,
+        entropy=entropy,
+    )
+
+
+class StatsAccumulator:
+    """
+    Accumulate n-gram counts over a text that is passed in chunks.
+
+    N-grams crossing chunk boundaries are counted, and accumulators of consecutive shards of a text can be merged.
+    The memory use only depends on the alphabet size.
+
+    >>> accumulator = StatsAccumulator()
+    >>> accumulator.update("HELLO ")
+    >>> accumulator.update("world")
+    >>> tail = StatsAccumulator()
+    >>> tail.update("HELLO")
+    >>> stats = accumulator.merge(tail).finalize()
+    >>> reference = calc_stats("HELLOWORLDHELLO")
+    >>> stats.letter_count, stats.trigrams == reference.trigrams, stats.bigrams == reference.bigrams
+    (15, True, True)
+    """
+
+    def __init__(self):
+        """Create an empty accumulator."""
+        self.monogram_counts = array("Q", [0]) * 26
+        self.bigram_counts = array("Q", [0]) * 26**2
+        self.trigram_counts = array("Q", [0]) * 26**3
+        self._head = b""
+        self._tail = b""
+
+    def _add(self, counts: array, codes: Iterable[int]):
+        for code, count in Counter(codes).items():
+            counts[code] += count
+
+    def update_codes(self, codes: bytes):
+        """
+        Add the next chunk of letter codes (see `encode_letters`).
+
+        :param codes: The letter codes.
+        """
+        if not codes:
+            return
+
+        self._add(self.monogram_counts, codes)
+        self._add(self.bigram_counts, ngram_codes(self._tail[-1:] + codes, 2))
+        self._add(self.trigram_counts, ngram_codes(self._tail + codes, 3))
+        self._head = (self._head + codes[:2])[:2]
+        self._tail = (self._tail + codes[-2:])[-2:]
+
+    def update(self, text: Union[str, TextBuffer]):
+        """
+        Add the next chunk of text, handled like in `calc_array_stats`.
+
+        :param text: The text, or its text buffer.
+        """
+        self.update_codes(bytes(letter_codes(text)))
+
+    def update_file(self, path: Union[str, Path], start: int = 0, end: Optional[int] = None, chunk_size: int = 1 << 24):
+        """
+        Add the ASCII letters of a file, memory-mapping it and reading it in chunks.
+
+        :param path: The file to read.
+        :param start: The first byte offset to read.
+        :param end: The byte offset to stop reading at, defaults to the file size.
+        :param chunk_size: The size of the chunks to process at once.
+
+        >>> import tempfile
+        >>> with tempfile.TemporaryDirectory() as tmp:
+        ...     path = Path(tmp) / "text.txt"
+        ...     _ = path.write_text("Hello, World! Hello again.")
+        ...     accumulator = StatsAccumulator()
+        ...     accumulator.update_file(path, 7, chunk_size=4)
+        >>> stats, reference = accumulator.finalize(), calc_array_stats("World! Hello again.")
+        >>> stats.letter_count, stats.bigrams == reference.bigrams, stats.trigrams == reference.trigrams
+        (15, True, True)
+        """
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            end = size if end is None else min(end, size)
+            if start >= end:
+                return
+
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                for pos in range(start, end, chunk_size):
+                    self.update_codes(_encode_ascii_letters(data[pos : min(pos + chunk_size, end)]))
+
+    def merge(self, other: "StatsAccumulator") -> "StatsAccumulator":
+        """
+        Merge the counts of the text following the text counted by this accumulator.
+
+        :param other: The accumulator of the following text.
+        :return: This accumulator.
+        """
+        for counts, other_counts in (
+            (self.monogram_counts, other.monogram_counts),
+            (self.bigram_counts, other.bigram_counts),
+            (self.trigram_counts, other.trigram_counts),
+        ):
+            for code in compress(range(len(other_counts)), other_counts):
+                counts[code] += other_counts[code]
+
+        # The tail and head are at most two letters long, so these n-grams all span the boundary
+        self._add(self.bigram_counts, ngram_codes(self._tail[-1:] + other._head[:1], 2))
+        self._add(self.trigram_counts, ngram_codes(self._tail + other._head, 3))
+        self._head = (self._head + other._head)[:2]
+        self._tail = (self._tail + other._tail)[-2:]
+        return self
+
+    def finalize(self) -> ArrayStats:
+        """
+        Calculate the stats of the accumulated text.
+
+        :return: The stats.
+        """
+        return ArrayStats.from_dense_counts(self.monogram_counts, self.bigram_counts, self.trigram_counts)
+
+
+def count_file_shard(path: Union[str, Path], start: int, end: int) -> StatsAccumulator:
+    """
+    Count the n-grams of a byte range of a file.
+
+    :param path: The file to read.
+    :param start: The first byte offset to read.
+    :param end: The byte offset to stop reading at.
+    :return: The accumulated counts.
+    """
+    accumulator = StatsAccumulator()
+    accumulator.update_file(path, start, end)
+    return accumulator
+
+
+def calc_file_stats(path: Union[str, Path], processes: Optional[int] = None) -> ArrayStats:
+    """
+    Calculate the stats of the ASCII letters in a file, counting shards of the file in parallel.
+
+    :param path: The file to read.
+    :param processes: The number of worker processes, defaults to the number of CPUs.
+    :return: The stats.
+
+    >>> import tempfile
+    >>> text = "The quick brown fox jumps over the lazy dog. " * 3
+    >>> with tempfile.TemporaryDirectory() as tmp:
+    ...     path = Path(tmp) / "text.txt"
+    ...     _ = path.write_text(text)
+    ...     results = [calc_file_stats(path, processes) for processes in (1, 4)]
+    >>> reference = calc_array_stats(text)
+    >>> [(stats.letter_count, stats.bigrams == reference.bigrams, stats.trigrams == reference.trigrams)
+    ...  for stats in results]
+    [(105, True, True), (105, True, True)]
+    """
+    processes = processes or os.cpu_count() or 1
+    size = Path(path).stat().st_size
+    shard_size = max(1, -(-size // processes))
+    bounds = [(start, min(start + shard_size, size)) for start in range(0, size, shard_size)]
+
+    result = StatsAccumulator()
+    if processes == 1 or len(bounds) <= 1:
+        for start, end in bounds:
+            result.merge(count_file_shard(path, start, end))
+        return result.finalize()
+
+    with ProcessPoolExecutor(processes) as executor:
+        for shard in executor.map(count_file_shard, *zip(*((path, start, end) for start, end in bounds))):
+            result.merge(shard)
+    return result.finalize()
+
+
+def _residue_letter_counts(codes: bytes, period: int) -> List[Sequence[int]]:
+    """Count the letters of each residue class of a period, one tuple of 26 counts per class."""
+    if len(codes) >= 32 * period:
+        # Long classes are scanned faster by counting each letter in C
+        return [tuple(map(codes[residue::period].count, range(26))) for residue in range(period)]
+
+    # Short classes are counted together in one pass over the text, keyed by class and letter
+    counts = [0] * (period * 26)
+    for key, count in Counter(map(add, islice(cycle(range(0, period * 26, 26)), len(codes)), codes)).items():
+        counts[key] = count
+    return [counts[start : start + 26] for start in range(0, len(counts), 26)]
+
+
+def periodic_coincidence_indices(
+    text: Union[str, TextBuffer, Sequence[int]],
+    max_period: Optional[int] = None,
+) -> Sequence[float]:
+    """
+    Calculate the mean index of coincidence of the residue classes for each period of a text.
+
+    For a period `p`, the text is split into the `p` classes of letters whose positions are congruent modulo `p`. For
+    polyalphabetic ciphers, the mean IC of the classes is close to the IC of the language if `p` is a multiple of the
+    key length (Friedman test). Classes with less than two letters are ignored.
+
+    :param text: The text, handled like in `calc_array_stats`, or its letter codes.
+    :param max_period: The maximum period, defaults to a fourth of the text length but at most 200, as each period
+                       takes a pass over the text.
+    :return: The mean IC for each period, starting at period 1.
+
+    >>> [round(ic, 3) for ic in periodic_coincidence_indices("ABCABCABCABD", 4)]
+    [0.227, 0.167, 0.833, 0.0]
+    """
+    codes = bytes(letter_codes(text))
+    if max_period is None:
+        max_period = max(1, min(len(codes) // 4, 200))
+
+    result = array("d")
+    for period in range(1, max_period + 1):
+        coincidences = 0
+        pairs = 0
+        for residue, counts in enumerate(_residue_letter_counts(codes, period)):
+            letter_count = len(range(residue, len(codes), period))
+            if letter_count < 2:
+                continue
+            coincidences += sum(map(mul, counts, map(sub, counts, repeat(1)))) / (letter_count * (letter_count - 1))
+            pairs += 1
+        result.append(coincidences / pairs if pairs else 0.0)
+    return result
+
+
+def rank_periods(
+    text: Union[str, TextBuffer, Sequence[int]],
+    max_period: Optional[int] = None,
+    reference_ic: Optional[float] = None,
+) -> List[Tuple[int, float]]:
+    """
+    Rank the periods of a text by their mean index of coincidence, see `periodic_coincidence_indices`.
+
+    Long periods have small residue classes, so their ICs scatter widely and some score well by chance. Each IC is
+    therefore ranked by the lower end of its confidence interval, two binomial standard errors wide. The multiples of
+    the key length still score about as well as the key length itself. So a period is preceded by its smallest
+    divisor whose score is within a quarter of the way from the period's score to the score of random text, and the
+    fundamental period ranks first.
+
+    :param text: The text, handled like in `calc_array_stats`, or its letter codes.
+    :param max_period: The maximum period, see `periodic_coincidence_indices`.
+    :param reference_ic: If given, rank by the distance to this IC instead of ranking higher ICs first.
+    :return: Tuples of the period and its mean IC, best first.
+
+    >>> rank_periods("ABCABCABCABD", 4)[0]
+    (3, 0.8333333333333334)
+    >>> rank_periods("ABCABDABCABCABCABD", 8)[:2]
+    [(3, 0.8222222222222223), (6, 0.8888888888888888)]
+    """
+    codes = letter_codes(text)
+    ics = periodic_coincidence_indices(codes, max_period)
+    random_ic = 1 / 26
+
+    errors = []
+    for period, ic in enumerate(ics, 1):
+        # The classes have `size + 1` letters for the first `longer` residues and `size` letters for the others
+        size, longer = divmod(len(codes), period)
+        pair_count = longer * (size + 1) * size // 2 + (period - longer) * size * (size - 1) // 2
+        p = max(ic, random_ic)
+        margin = 2 * math.sqrt(p * (1 - p) / max(1, pair_count))
+        errors.append((-ic if reference_ic is None else abs(ic - reference_ic)) + margin)
+    random_error = -random_ic if reference_ic is None else abs(random_ic - reference_ic)
+
+    result: List[Tuple[int, float]] = []
+    ranked = [False] * len(ics)
+    for i in sorted(range(len(ics)), key=errors.__getitem__):
+        if ranked[i]:
+            continue
+        period = i + 1
+        threshold = errors[i] + (random_error - errors[i]) / 4
+        for divisor in range(1, period):
+            if period % divisor == 0 and not ranked[divisor - 1] and errors[divisor - 1] <= threshold:
+                ranked[divisor - 1] = True
+                result.append((divisor, ics[divisor - 1]))
+                break
+        ranked[i] = True
+        result.append((period, ics[i]))
+    return result
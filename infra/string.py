@@ -1,8 +1,8 @@
 """String-related utility functions."""
 
-from typing import Iterable, Optional, Tuple
+from typing import Dict, Iterable, List, Optional, Tuple
 
-from infra.nla import alphabet_fi
+from infra.text import alphabet_fi, alphabet_index
 from infra.utils import split_every
 
 
@@ -35,10 +35,7 @@ def char_idx(char: str) -> Optional[int]:
     (0, 1, 27, None)
     """
     assert len(char) == 1
-    try:
-        return alphabet_fi.index(char)
-    except ValueError:
-        return None
+    return alphabet_index(alphabet_fi).get(char)
 
 
 def insert_spaces(string: str, every: int) -> str:
@@ -67,13 +64,10 @@ def kasiski_positions(text: str, length: int = 2) -> Iterable[Tuple[str, Tuple[i
     """
     assert length >= 2
 
-    checked = set()
+    positions: Dict[str, List[int]] = {}
     for i in range(len(text) + 1 - length):
-        ngram = text[i : i + length]
-        if ngram in checked:
-            continue
-        checked.add(ngram)
+        positions.setdefault(text[i : i + length], []).append(i)
 
-        indices = tuple(all_string_indices(text, ngram))
+    for ngram, indices in positions.items():
         if len(indices) > 1:
-            yield ngram, indices
+            yield ngram, tuple(indices)
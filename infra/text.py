@@ -0,0 +1,201 @@
+"""Letter-coded text buffers shared by the analysis and cipher functions."""
+
+from functools import lru_cache
+from string import ascii_uppercase
+from typing import Dict, Iterator, List, Mapping, Optional, Tuple, Union, overload
+
+alphabet_en = ascii_uppercase
+alphabet_fi = "ABCDEFGHIJKLMNOPQRSTUVWXYZÅÄÖ"
+
+
+@lru_cache(maxsize=None)
+def alphabet_index(alphabet: str) -> Dict[str, int]:
+    """
+    Get the index of each character of an alphabet.
+
+    :param alphabet: The alphabet.
+    :return: The indices by character.
+
+    >>> alphabet_index("ABC")
+    {'A': 0, 'B': 1, 'C': 2}
+    """
+    return {c: i for i, c in enumerate(alphabet)}
+
+
+@lru_cache(maxsize=None)
+def _encode_tables(alphabet: str) -> Tuple[bytes, bytes]:
+    """Get the translation table and the bytes to delete for encoding Latin-1 bytes to letter codes."""
+    data = alphabet.encode("latin-1")
+    assert len(data) == len(set(data)) <= 256
+    table = bytearray(range(256))
+    for code, byte in enumerate(data):
+        table[byte] = code
+    return bytes(table), bytes(sorted(set(range(256)) - set(data)))
+
+
+@lru_cache(maxsize=None)
+def _decode_table(alphabet: str) -> bytes:
+    data = alphabet.encode("latin-1")
+    return data + bytes(256 - len(data))
+
+
+@lru_cache(maxsize=None)
+def _recode_tables(source: str, target: str, missing: Optional[int]) -> Tuple[bytes, bytes]:
+    """Get the translation table and the bytes to delete for recoding letter codes to another alphabet."""
+    index = alphabet_index(target)
+    table = bytearray(range(256))
+    deleted = bytearray()
+    for code, c in enumerate(source):
+        if c in index:
+            table[code] = index[c]
+        elif missing is None:
+            deleted.append(code)
+        else:
+            table[code] = missing
+    return bytes(table), bytes(deleted)
+
+
+class TextBuffer:
+    """
+    A text normalized once to the letter codes of an alphabet, the first letter being 0.
+
+    The codes are held in a memoryview of unsigned bytes, so slices, columns and strided views share the memory of the
+    buffer they were taken from instead of copying it. Indexing by an integer returns a letter code.
+
+    >>> text = TextBuffer.from_text("Hello, World!")
+    >>> len(text), text[0], str(text[1:5]), str(text[::2])
+    (10, 7, 'ELLO', 'HLOOL')
+    >>> [str(column) for column in text.columns(3)]
+    ['HLOD', 'EOR', 'LWL']
+    >>> str(TextBuffer.from_text("Hyvää yötä", alphabet_fi))
+    'HYVÄÄYÖTÄ'
+    """
+
+    __slots__ = ("codes", "alphabet")
+
+    def __init__(self, codes: Union[bytes, bytearray, memoryview], alphabet: str = alphabet_en):
+        """
+        Wrap letter codes without copying them.
+
+        :param codes: The letter codes, each one less than the alphabet length.
+        :param alphabet: The alphabet the codes refer to.
+        """
+        self.codes = codes if isinstance(codes, memoryview) else memoryview(codes)
+        self.alphabet = alphabet
+
+    @classmethod
+    def from_text(cls, text: str, alphabet: str = alphabet_en) -> "TextBuffer":
+        """
+        Encode a text, converting it to uppercase and dropping all characters outside the alphabet.
+
+        :param text: The text.
+        :param alphabet: The uppercase alphabet, consisting of Latin-1 characters.
+        :return: The text buffer.
+        """
+        table, deleted = _encode_tables(alphabet)
+        return cls(text.upper().encode("latin-1", "ignore").translate(table, deleted), alphabet)
+
+    def __len__(self) -> int:  # noqa D105
+        return len(self.codes)
+
+    def __iter__(self) -> Iterator[int]:  # noqa D105
+        return iter(self.codes)
+
+    @overload
+    def __getitem__(self, index: int) -> int:  # noqa D105
+        ...
+
+    @overload
+    def __getitem__(self, index: slice) -> "TextBuffer":  # noqa D105
+        ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[int, "TextBuffer"]:  # noqa D105
+        if isinstance(index, slice):
+            return TextBuffer(self.codes[index], self.alphabet)
+        return self.codes[index]
+
+    def __eq__(self, other: object) -> bool:  # noqa D105
+        return isinstance(other, TextBuffer) and self.alphabet == other.alphabet and self.codes == other.codes
+
+    def __hash__(self) -> int:  # noqa D105
+        return hash((self.alphabet, bytes(self.codes)))
+
+    def __bytes__(self) -> bytes:  # noqa D105
+        return self.codes.tobytes()
+
+    def __str__(self) -> str:  # noqa D105
+        return self.codes.tobytes().translate(_decode_table(self.alphabet)).decode("latin-1")
+
+    def __repr__(self) -> str:  # noqa D105
+        return f"TextBuffer.from_text({str(self)!r})"
+
+    def column(self, index: int, count: int) -> "TextBuffer":
+        """
+        Get a column of the text written in rows of a given length.
+
+        :param index: The column index.
+        :param count: The number of columns.
+        :return: A strided view of the column.
+        """
+        return self[index::count]
+
+    def columns(self, count: int) -> List["TextBuffer"]:
+        """
+        Get all columns of the text written in rows of a given length.
+
+        :param count: The number of columns.
+        :return: Strided views of the columns.
+        """
+        return [self.column(index, count) for index in range(count)]
+
+    def rows(self, length: int) -> List["TextBuffer"]:
+        """
+        Split the text into rows of a given length, like `infra.utils.split_every`.
+
+        :param length: The row length.
+        :return: Views of the rows, only the last one may be shorter.
+        """
+        return [self[start : start + length] for start in range(0, len(self), length)]
+
+    def translate(self, table: bytes) -> "TextBuffer":
+        """
+        Map each letter code with a translation table, e.g. to apply a substitution.
+
+        :param table: The translation table of 256 codes, see `bytes.translate`.
+        :return: A new text buffer.
+
+        >>> str(TextBuffer.from_text("ABC").translate(bytes([2, 1, 0]) + bytes(range(3, 256))))
+        'CBA'
+        """
+        return TextBuffer(self.codes.tobytes().translate(table), self.alphabet)
+
+    def recode(self, alphabet: str, missing: Optional[int] = None) -> "TextBuffer":
+        """
+        Convert the text to the letter codes of another alphabet.
+
+        :param alphabet: The target alphabet.
+        :param missing: The code of letters missing from the target alphabet; they are dropped if None.
+        :return: The text buffer, this one if the alphabet is the same.
+
+        >>> text = TextBuffer.from_text("Hyvää yötä", alphabet_fi)
+        >>> str(text.recode(alphabet_en)), list(text.recode(alphabet_en, 26))[-3:]
+        ('HYVYT', [26, 19, 26])
+        """
+        if alphabet == self.alphabet:
+            return self
+        table, deleted = _recode_tables(self.alphabet, alphabet, missing)
+        return TextBuffer(self.codes.tobytes().translate(table, deleted), alphabet)
+
+    def substitute(self, key: Mapping[str, str]) -> "TextBuffer":
+        """
+        Substitute letters of the alphabet with other letters of the alphabet.
+
+        :param key: The substitutions, other letters are left unchanged.
+        :return: A new text buffer.
+        """
+        index = alphabet_index(self.alphabet)
+        table = bytearray(range(256))
+        for c, replacement in key.items():
+            if c in index:
+                table[index[c]] = index[replacement]
+        return self.translate(table)
@@ -0,0 +1,173 @@
+"""Multi-pattern dictionary word search."""
+
+from collections import deque
+from enum import Enum, auto
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple, Union
+
+from infra import nla
+from infra.text import TextBuffer
+
+
+class WordCoverage(Enum):
+    """How to count the characters covered by dictionary words."""
+
+    Greedy = auto()
+    """Take the longest word at the leftmost position, then continue after it; words do not overlap."""
+
+    Maximal = auto()
+    """Count every character that is part of any word; words may overlap."""
+
+
+class WordAutomaton:
+    """
+    An Aho-Corasick automaton finding all occurrences of a set of words in one linear scan.
+
+    >>> automaton = WordAutomaton(["HE", "SHE", "HERS", "HIS"])
+    >>> sorted(automaton.find_all("USHERS"))
+    [(1, 3), (2, 2), (2, 4)]
+    >>> automaton.covered_chars("USHERS", WordCoverage.Greedy), automaton.covered_chars("USHERS", WordCoverage.Maximal)
+    (3, 5)
+    """
+
+    def __init__(self, words: Iterable[str]):
+        """
+        Compile the automaton.
+
+        :param words: The words to search for.
+        """
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._lengths: List[Tuple[int, ...]] = [()]
+
+        for word in words:
+            if not word:
+                continue
+            state = 0
+            for char in word:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._lengths.append(())
+                state = next_state
+            if len(word) not in self._lengths[state]:
+                self._lengths[state] += (len(word),)
+
+        # Breadth-first, so the failure state of each state is complete before it is used
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail = self._goto[fail].get(char, 0)
+                self._fail[next_state] = fail
+                self._lengths[next_state] += self._lengths[fail]
+
+    def find_all(self, text: str) -> Iterator[Tuple[int, int]]:
+        """
+        Find all word occurrences.
+
+        :param text: The text to search in.
+        :return: Tuples of the start index and length of each occurrence, ordered by their end index.
+        """
+        goto = self._goto
+        fail = self._fail
+        lengths = self._lengths
+        state = 0
+        for end, char in enumerate(text, 1):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for length in lengths[state]:
+                yield end - length, length
+
+    def longest_words(self, text: str) -> List[int]:
+        """
+        Get the length of the longest word starting at each position.
+
+        :param text: The text to search in.
+        :return: The lengths, 0 where no word starts.
+        """
+        result = [0] * len(text)
+        for start, length in self.find_all(text):
+            if length > result[start]:
+                result[start] = length
+        return result
+
+    def covered_chars(self, text: str, coverage: WordCoverage = WordCoverage.Greedy) -> int:
+        """
+        Count the characters covered by words.
+
+        :param text: The text to search in.
+        :param coverage: How to count the covered characters.
+        :return: The number of covered characters.
+        """
+        longest = self.longest_words(text)
+        covered = 0
+        if coverage == WordCoverage.Greedy:
+            pos = 0
+            while pos < len(longest):
+                if longest[pos]:
+                    covered += longest[pos]
+                    pos += longest[pos]
+                else:
+                    pos += 1
+        elif coverage == WordCoverage.Maximal:
+            reach = 0
+            for pos, length in enumerate(longest):
+                reach = max(reach, pos + length)
+                if pos < reach:
+                    covered += 1
+        else:
+            raise ValueError
+        return covered
+
+    def covered_chars_batch(self, texts: Iterable[str], coverage: WordCoverage = WordCoverage.Greedy) -> List[int]:
+        """
+        Count the characters covered by words for many texts.
+
+        :param texts: The texts to search in.
+        :param coverage: How to count the covered characters.
+        :return: The number of covered characters of each text.
+        """
+        return [self.covered_chars(text, coverage) for text in texts]
+
+
+@lru_cache(maxsize=None)
+def dictionary_automaton_en(min_word_length: int = 3, max_word_length: int = 12) -> WordAutomaton:
+    """
+    Get the automaton of the words in `infra.nla.dict_std_en` within a length range, compiled on first use.
+
+    :param min_word_length: The minimum word length.
+    :param max_word_length: The maximum word length.
+    :return: The automaton.
+
+    >>> sorted(dictionary_automaton_en().find_all("XXHELLOXX"))
+    [(2, 4), (2, 5)]
+    """
+    return WordAutomaton(word for word in nla.dict_std_en if min_word_length <= len(word) <= max_word_length)
+
+
+def word_fitness_batch_en(
+    texts: Sequence[Union[str, TextBuffer]],
+    min_word_length: int = 3,
+    max_word_length: int = 12,
+    coverage: WordCoverage = WordCoverage.Greedy,
+) -> List[float]:
+    """
+    Calculate the dictionary word fitness of many texts, see `infra.ciphers.transposition.word_fitness_en`.
+
+    :param texts: The texts to scan, or their text buffers.
+    :param min_word_length: The minimum word length to consider.
+    :param max_word_length: The maximum word length to consider.
+    :param coverage: How to count the characters covered by words.
+    :return: The fitness of each text.
+    """
+    automaton = dictionary_automaton_en(min_word_length, max_word_length)
+    return [max(1, automaton.covered_chars(str(text).upper(), coverage)) / len(text) for text in texts]
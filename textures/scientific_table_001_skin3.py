@@ -2,7 +2,7 @@
 
 from typing import Dict, Iterable, Sequence, Tuple
 
-from infra.dict import find_string_chars
+from infra.dict import CharIndex
 from infra.output import section
 
 scientific_table_001_skin3 = {
@@ -17,11 +17,12 @@ scientific_table_001_skin3 = {
     "YT": "LGJVZUNTTISRAGHTPEWDNLAPAWM",
     "XT": "DMYFUDKINHTYXOPOYBÖÄÅPFHSRE",
 }
+_scientific_table_001_skin3_index = CharIndex(scientific_table_001_skin3)
 
 
 def _print_string_code(string: str):
     print(f"{string=}")
-    for char, codes in find_string_chars(scientific_table_001_skin3, string):
+    for char, codes in _scientific_table_001_skin3_index.find_string_chars(string):
         code_str = ", ".join(f"{row}:{col}" for row, col in codes)
         print(char, code_str)
 